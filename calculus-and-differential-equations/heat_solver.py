@@ -0,0 +1,218 @@
+"""
+The explicit finite difference scheme for the heat equation,
+
+    u_{i+1} = A u_i,
+
+is only stable when r = alpha*k/h**2 < 0.5, so halving the grid spacing h
+forces four times as many time steps. Implicit schemes are stable for any
+time step. Backward Euler solves
+
+    (I - k*alpha*L) u_{i+1} = u_i
+
+and Crank-Nicolson, which is second order accurate in time, solves
+
+    (I - k*alpha*L/2) u_{i+1} = (I + k*alpha*L/2) u_i,
+
+where L is the second difference operator. The matrix on the left is the same
+at every step, so it is factorized once (with the LAPACK routine for
+tridiagonal matrices) and each step is then a pair of triangular solves,
+costing O(N) operations. The time step can then be chosen for accuracy rather
+than for stability.
+
+Keeping every time level in memory, as the explicit recipe does, takes
+O(steps*N) memory. Here the time levels are produced by an iterator that
+keeps only two buffers and updates them in place, and the levels that are
+wanted are written, at a stride, to a memory-mapped file.
+
+As in the explicit recipe, the first and last rows of each matrix are rows of
+the identity, so the boundary values u(t, x0) and u(t, xL) keep their initial
+values (Dirichlet boundary conditions).
+"""
+import time
+import numpy as np
+
+from numpy.lib.format import open_memmap
+from scipy import sparse
+from scipy.linalg import lapack
+
+METHODS = ("explicit", "backward-euler", "crank-nicolson")
+
+def second_difference(N, h, boundary="dirichlet"):
+    """
+    The (N+1)x(N+1) second difference operator on N intervals of width h.
+
+    With Dirichlet boundaries the first and last rows are zero, so the
+    boundary values do not change. With (zero flux) Neumann boundaries the
+    end rows use a ghost point reflected in the boundary.
+    """
+    if boundary == "dirichlet":
+        diag = [0, *(-2/h**2 for _ in range(N-1)), 0]
+        abv_diag = [0, *(1/h**2 for _ in range(N-1))]
+        blw_diag = [*(1/h**2 for _ in range(N-1)), 0]
+    elif boundary == "neumann":
+        diag = [-2/h**2 for _ in range(N+1)]
+        abv_diag = [2/h**2, *(1/h**2 for _ in range(N-1))]
+        blw_diag = [*(1/h**2 for _ in range(N-1)), 2/h**2]
+    else:
+        raise ValueError(f"unknown boundary {boundary!r}")
+    return sparse.diags([blw_diag, diag, abv_diag], (-1, 0, 1),
+                        shape=(N+1, N+1), dtype=np.float64, format="csr")
+
+def _stencil(u, out, a, b):
+    # out[1:-1] = b*u[1:-1] + a*(u[:-2] + u[2:]) without temporary arrays
+    inner = out[1:-1]
+    np.add(u[:-2], u[2:], out=inner)
+    if b == 0.0:
+        inner *= a
+    else:
+        inner *= a/b
+        inner += u[1:-1]
+        inner *= b
+    out[0] = u[0]
+    out[-1] = u[-1]
+
+def make_stepper(N, h, k, alpha=1.0, method="crank-nicolson"):
+    """
+    Return a function step(u, out) that writes the solution one time step of
+    length k after u into out. The implicit methods factorize their
+    tridiagonal matrix here, once, and each step solves in place in out.
+    """
+    r = alpha*k / h**2
+    if method == "explicit":
+        assert r < 0.5, f"Must have r < 0.5, currently r={r}"
+        return lambda u, out: _stencil(u, out, r, 1 - 2*r)
+    if method not in METHODS:
+        raise ValueError(
+            f"unknown method {method!r}, expected one of {METHODS}")
+
+    theta = 1.0 if method == "backward-euler" else 0.5
+    # I - theta*k*alpha*L, with rows of the identity at the boundaries
+    A = (sparse.identity(N+1, format="csr")
+         - theta*k*alpha*second_difference(N, h)).todia()
+    dl, d, du, du2, ipiv, info = lapack.dgttrf(
+        A.diagonal(-1), A.diagonal(), A.diagonal(1))
+    if info:
+        raise np.linalg.LinAlgError(f"dgttrf failed (info={info})")
+
+    def step(u, out):
+        if theta == 1.0:
+            out[:] = u
+        else:
+            _stencil(u, out, (1 - theta)*r, 1 - 2*(1 - theta)*r)
+        x, info = lapack.dgttrs(dl, d, du, du2, ipiv, out, overwrite_b=True)
+        if x is not out:
+            out[:] = x
+
+    return step
+
+def time_steps(initial_profile, x0, xL, N, k, steps, alpha=1.0,
+               method="crank-nicolson"):
+    """
+    Iterate over the time levels of the heat equation on [x0, xL] with N
+    intervals, yielding (i, t, u) for i = 0, ..., steps. Only two buffers are
+    kept and they are reused, so u is overwritten by the next step; copy it
+    to keep it.
+    """
+    x = np.linspace(x0, xL, N+1)
+    h = (xL - x0)/N
+    step = make_stepper(N, h, k, alpha, method)
+
+    current = np.array(initial_profile(x), dtype=np.float64)
+    following = np.empty_like(current)
+    yield 0, 0.0, current
+    for i in range(1, steps+1):
+        step(current, following)
+        current, following = following, current
+        yield i, i*k, current
+
+def solve_heat(initial_profile, x0, xL, N, k, steps, alpha=1.0,
+               method="crank-nicolson", save_every=1):
+    """
+    Solve the heat equation on [x0, xL] with N intervals, taking steps time
+    steps of length k. Returns the times, the grid points and the solution at
+    every save_every-th step (one row per saved time).
+    """
+    x = np.linspace(x0, xL, N+1)
+    saved = range(0, steps+1, save_every)
+    u = np.zeros((len(saved), N+1), dtype=np.float64)
+    for i, _, current in time_steps(initial_profile, x0, xL, N, k, steps,
+                                    alpha, method):
+        if i % save_every == 0:
+            u[i // save_every, :] = current
+    t = np.array([i*k for i in saved])
+    return t, x, u
+
+def solve_to_file(initial_profile, x0, xL, N, k, steps, path, alpha=1.0,
+                  method="crank-nicolson", save_every=1):
+    """
+    Solve the heat equation and write the solution at every save_every-th
+    step to a memory-mapped .npy file at path, one row per saved time, so
+    only O(N) memory is used. Returns the times and the grid points; the
+    solution can be read back with np.load(path, mmap_mode="r").
+    """
+    x = np.linspace(x0, xL, N+1)
+    saved = range(0, steps+1, save_every)
+    u = open_memmap(path, mode="w+", dtype=np.float64,
+                    shape=(len(saved), N+1))
+    for i, _, current in time_steps(initial_profile, x0, xL, N, k, steps,
+                                    alpha, method):
+        if i % save_every == 0:
+            u[i // save_every, :] = current
+    u.flush()
+    del u
+    t = np.array([i*k for i in saved])
+    return t, x
+
+def to_netcdf(npy_path, nc_path, t, x, chunk_size=100):
+    """
+    Copy the snapshots in the .npy file written by solve_to_file to a NetCDF
+    file using xarray, streaming chunk_size time levels at a time through
+    dask.
+    """
+    import dask.array as da
+    import xarray as xr
+
+    u = da.from_array(np.load(npy_path, mmap_mode="r"),
+                      chunks=(chunk_size, -1))
+    ds = xr.Dataset({"u": (("t", "x"), u)}, coords={"t": t, "x": x})
+    ds.to_netcdf(nc_path)
+
+
+if __name__ == "__main__":
+    def initial_profile(x):
+        return 3*np.sin(np.pi*x/2)
+
+    def exact(t, x):
+        return 3*np.sin(np.pi*x/2)*np.exp(-np.pi**2*t/4)
+
+    N = 1000
+    t_end = 0.1
+    h = 2/N
+    explicit_k = 0.45*h**2  # largest stable step, with some margin
+
+    for method, k in [("explicit", explicit_k),
+                      ("backward-euler", 1e-4),
+                      ("crank-nicolson", 1e-3)]:
+        steps = int(round(t_end/k))
+        t_start = time.perf_counter()
+        t, x, u = solve_heat(initial_profile, 0, 2, N, t_end/steps, steps,
+                             method=method, save_every=steps)
+        elapsed = time.perf_counter() - t_start
+        error = np.abs(u[-1] - exact(t[-1], x)).max()
+        print(f"{method:>14}: {steps:>6} steps in {elapsed:.3f}s, "
+              f"max error {error:.2e}")
+
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "heat.npy")
+        t_start = time.perf_counter()
+        t, x = solve_to_file(initial_profile, 0, 2, 10**6, 1e-3, 100, path,
+                             save_every=10)
+        elapsed = time.perf_counter() - t_start
+        u = np.load(path, mmap_mode="r")
+        error = np.abs(u[-1] - exact(t[-1], x)).max()
+        print(f"N=10**6, 100 steps to {path}: {u.shape} snapshots in "
+              f"{elapsed:.2f}s, max error {error:.2e}")
+        del u
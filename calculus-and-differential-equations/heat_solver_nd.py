@@ -0,0 +1,189 @@
+"""
+The heat equation in two or three dimensions,
+
+    partial u / partial t = alpha * sum_d [partial**2 u / (partial x_d)**2],
+
+is discretized on a rectangular grid by the same second difference operator as
+in one dimension (heat_solver.second_difference), applied along each axis. If L_d is the 1-D operator for
+axis d, the Laplacian on the whole grid (with the unknowns stored in C order)
+is the Kronecker sum
+
+    L = sum over d of I ⊗ ... ⊗ L_d ⊗ ... ⊗ I,
+
+so it is assembled from the 1-D ``diags`` matrices with ``sparse.kron``.
+
+Each axis has either Dirichlet boundaries (u = 0 on both ends; only the
+interior points are unknowns) or Neumann boundaries (zero flux; the end points
+are unknowns and the second difference there uses a reflected ghost point).
+The Neumann operator is not symmetric, but it becomes symmetric after scaling
+the end rows by 1/2, so the implicit system is multiplied by these weights
+before it is solved.
+
+Time steps are implicit (backward Euler or Crank-Nicolson). With a million
+unknowns a direct factorization is expensive, so the symmetric positive
+definite system is solved by the conjugate gradient method, starting from the
+current solution, with an algebraic multigrid preconditioner when pyamg is
+installed and the diagonal (Jacobi) preconditioner otherwise.
+"""
+import time
+import numpy as np
+
+from functools import reduce
+from scipy import sparse
+from scipy.sparse.linalg import cg, LinearOperator
+from heat_solver import second_difference
+
+try:
+    import pyamg
+except ImportError:
+    pyamg = None
+
+THETA = {"backward-euler": 1.0, "crank-nicolson": 0.5}
+
+def second_difference_1d(N, h, boundary="dirichlet"):
+    """
+    The 1-D second difference operator of heat_solver on the unknowns of one
+    axis, and the weights that make it symmetric. With Dirichlet boundaries
+    the boundary values are zero, so only the interior rows and columns are
+    kept.
+    """
+    L = second_difference(N, h, boundary)
+    if boundary == "dirichlet":
+        return L[1:-1, 1:-1], np.ones(N-1)
+    weights = np.ones(N+1)
+    weights[[0, -1]] = 0.5
+    return L, weights
+
+def grid_points(shape, lengths, boundary="dirichlet"):
+    """
+    The coordinates of the unknowns along each axis, for a grid of shape[d]
+    intervals on [0, lengths[d]].
+    """
+    boundary = _per_axis(boundary, len(shape))
+    axes = []
+    for N, length, bc in zip(shape, lengths, boundary):
+        x = np.linspace(0, length, N+1)
+        axes.append(x[1:-1] if bc == "dirichlet" else x)
+    return axes
+
+def _per_axis(value, ndim):
+    return (value,)*ndim if isinstance(value, str) else tuple(value)
+
+def laplacian(shape, lengths, boundary="dirichlet"):
+    """
+    Assemble the Laplacian on the grid as the Kronecker sum of the 1-D
+    operators. Returns the operator and the symmetrizing weights.
+    """
+    boundary = _per_axis(boundary, len(shape))
+    ops = [second_difference_1d(N, length/N, bc)
+           for N, length, bc in zip(shape, lengths, boundary)]
+    sizes = [L.shape[0] for L, _ in ops]
+
+    lap = None
+    for d, (L, _) in enumerate(ops):
+        before = sparse.identity(int(np.prod(sizes[:d])), format="csr")
+        after = sparse.identity(int(np.prod(sizes[d+1:])), format="csr")
+        term = sparse.kron(sparse.kron(before, L), after, format="csr")
+        lap = term if lap is None else lap + term
+    weights = reduce(np.multiply.outer, [w for _, w in ops]).ravel()
+    return lap, weights
+
+def _preconditioner(A, kind):
+    if kind == "auto":
+        kind = "amg" if pyamg is not None else "jacobi"
+    if kind == "amg":
+        return pyamg.smoothed_aggregation_solver(A).aspreconditioner()
+    if kind == "jacobi":
+        inv_diag = 1.0/A.diagonal()
+        return LinearOperator(A.shape, matvec=lambda v: inv_diag*v.ravel(),
+                              dtype=np.float64)
+    return None
+
+def make_stepper(shape, lengths, k, alpha=1.0, boundary="dirichlet",
+                 method="crank-nicolson", preconditioner="auto", rtol=1e-8,
+                 stats=None):
+    """
+    Return a function that advances the flattened solution u by one time
+    step of length k. preconditioner is "auto", "amg", "jacobi" or None. If
+    stats is a dict, the number of CG iterations of each step is appended to
+    stats["iterations"].
+    """
+    theta = THETA[method]
+    lap, weights = laplacian(shape, lengths, boundary)
+    W = sparse.diags(weights, format="csr")
+    # W @ lap is symmetric, so the weighted system is symmetric positive
+    # definite
+    WL = (W @ lap).tocsr()
+    A = (W - theta*k*alpha*WL).tocsr()
+    B = (W + (1 - theta)*k*alpha*WL).tocsr()
+    M = _preconditioner(A, preconditioner)
+
+    if stats is not None:
+        stats.setdefault("iterations", [])
+
+    def step(u):
+        count = [0]
+        def callback(xk):
+            count[0] += 1
+        u_next, info = cg(A, B @ u, x0=u, rtol=rtol, M=M, callback=callback)
+        if info:
+            raise RuntimeError(f"CG did not converge (info={info})")
+        if stats is not None:
+            stats["iterations"].append(count[0])
+        return u_next
+
+    return step
+
+def solve_heat(initial_profile, shape, lengths, k, steps, alpha=1.0,
+               boundary="dirichlet", method="crank-nicolson",
+               preconditioner="auto", rtol=1e-8, stats=None):
+    """
+    Solve the heat equation on the grid, starting from initial_profile(*X)
+    evaluated on the grid of unknowns, and return the grid coordinates and the
+    solution after steps time steps of length k (with the grid's shape).
+    """
+    axes = grid_points(shape, lengths, boundary)
+    X = np.meshgrid(*axes, indexing="ij")
+    step = make_stepper(shape, lengths, k, alpha, boundary, method,
+                        preconditioner, rtol, stats)
+    u = initial_profile(*X).ravel()
+    for _ in range(steps):
+        u = step(u)
+    return axes, u.reshape(X[0].shape)
+
+
+if __name__ == "__main__":
+    def sine_mode(*X):
+        return reduce(np.multiply, [np.sin(np.pi*x) for x in X])
+
+    def hot_spot(*X):
+        return np.exp(-100*sum((x - 0.5)**2 for x in X))
+
+    # accuracy: a sine mode decays as exp(-ndim*pi**2*t)
+    for method in THETA:
+        axes, u = solve_heat(sine_mode, (256, 256), (1, 1), 1e-3, 20,
+                             method=method)
+        X = np.meshgrid(*axes, indexing="ij")
+        error = np.abs(u - sine_mode(*X)*np.exp(-2*np.pi**2*0.02)).max()
+        print(f"{method}: max error {error:.1e}")
+
+    k = 1e-4
+    steps = 5
+    print(f"preconditioner: {'amg' if pyamg is not None else 'jacobi'}")
+    for shape in [(128, 128), (256, 256), (512, 512), (1024, 1024),
+                  (32, 32, 32), (64, 64, 64), (100, 100, 100)]:
+        t_start = time.perf_counter()
+        stats = {}
+        step = make_stepper(shape, (1,)*len(shape), k, stats=stats)
+        t_setup = time.perf_counter() - t_start
+
+        X = np.meshgrid(*grid_points(shape, (1,)*len(shape)), indexing="ij")
+        u = hot_spot(*X).ravel()
+        t_start = time.perf_counter()
+        for _ in range(steps):
+            u = step(u)
+        t_step = (time.perf_counter() - t_start)/steps
+
+        print(f"{'x'.join(map(str, shape)):>12} ({u.size:>7} unknowns): "
+              f"setup {t_setup:.2f}s, {t_step*1e3:7.1f}ms/step, "
+              f"{np.mean(stats['iterations']):.0f} CG iterations/step")
@@ -0,0 +1,203 @@
+"""
+The differential equation recipes fix the constants of their models, such as
+the cooling rate in Newton's law of cooling or the four rates of the
+predator-prey system. To see how the solutions depend on these constants, the
+equations are solved for every point of a grid of parameter values.
+
+The right-hand side is written as f(t, y, *params), with the parameters passed
+to solve_ivp through its args argument. The points of the grid are split
+into chunks that are solved on a pool of processes (so f must be defined at
+module level, where the worker processes can import it). Each solution is
+evaluated on a common grid of times, and the results are collected into an
+xarray Dataset with one dimension per parameter and one for time.
+
+If a checkpoint directory is given, each finished chunk is saved there as a
+.npz file. Running the same sweep again loads the finished chunks and only
+solves the points that are still missing, so an interrupted sweep can be
+resumed. The checkpoints only record which points of the grid they hold, so
+the directory also holds a manifest of the sweep (the parameter grid, y0,
+t_span, t_eval, the name of f and the solver options), and a sweep that does
+not match it is refused rather than mixed with the old results.
+"""
+import os
+import re
+import glob
+import itertools
+import numpy as np
+import xarray as xr
+
+from concurrent.futures import ProcessPoolExecutor
+from scipy import integrate
+
+def _solve_chunk(f, values, indices, y0, t_span, t_eval, solve_kwargs,
+                 path=None):
+    shape = tuple(len(v) for v in values)
+    y = np.full((len(indices), len(y0), len(t_eval)), np.nan)
+    status = np.empty(len(indices), dtype=int)
+    for i, index in enumerate(indices):
+        params = tuple(v[j] for v, j in zip(values, np.unravel_index(index,
+                                                                     shape)))
+        sol = integrate.solve_ivp(f, t_span, y0, t_eval=t_eval, args=params,
+                                  **solve_kwargs)
+        y[i, :, :sol.y.shape[1]] = sol.y
+        status[i] = sol.status
+    if path is not None:
+        # write to a temporary file first, so a partial file is never seen
+        head, tail = os.path.split(path)
+        tmp_path = os.path.join(head, "tmp_" + tail)
+        np.savez(tmp_path, indices=indices, y=y, status=status)
+        os.replace(tmp_path, path)
+    return indices, y, status
+
+def _manifest(f, names, values, y0, t_span, t_eval, solve_kwargs):
+    manifest = {"names": np.array(names), "y0": y0,
+                "t_span": np.asarray(t_span, dtype=np.float64),
+                "t_eval": t_eval,
+                "f": np.array(f"{f.__module__}.{f.__qualname__}"),
+                "solve_kwargs": np.array(repr(sorted(solve_kwargs.items())))}
+    for i, v in enumerate(values):
+        manifest[f"values_{i}"] = v
+    return manifest
+
+def _check_manifest(checkpoint_dir, manifest):
+    path = os.path.join(checkpoint_dir, "manifest.npz")
+    if not os.path.exists(path):
+        if glob.glob(os.path.join(checkpoint_dir, "chunk_*.npz")):
+            raise ValueError(f"{checkpoint_dir} has checkpoints but no "
+                             "manifest, so they cannot be resumed")
+        tmp_path = os.path.join(checkpoint_dir, "tmp_manifest.npz")
+        np.savez(tmp_path, **manifest)
+        os.replace(tmp_path, path)
+        return
+    with np.load(path) as saved:
+        differ = sorted(set(saved.files) ^ set(manifest))
+        differ += [key for key in manifest if key in saved.files
+                   and not (saved[key].shape == np.shape(manifest[key])
+                            and np.array_equal(saved[key], manifest[key]))]
+    if differ:
+        raise ValueError(f"the checkpoints in {checkpoint_dir} are from a "
+                         f"different sweep ({', '.join(differ)} differ)")
+
+def _load_checkpoints(checkpoint_dir):
+    paths = sorted(glob.glob(os.path.join(checkpoint_dir, "chunk_*.npz")))
+    for path in paths:
+        match = re.fullmatch(r"chunk_(\d+)\.npz", os.path.basename(path))
+        if match is None:
+            continue
+        number = int(match.group(1))
+        with np.load(path) as data:
+            yield number, data["indices"], data["y"], data["status"]
+
+def run_sweep(f, grid, y0, t_span, t_eval, state_names=None,
+              checkpoint_dir=None, chunk_size=32, workers=None, stats=None,
+              **solve_kwargs):
+    """
+    Solve y' = f(t, y, *params) from y0 for every combination of the
+    parameter values in grid (a dict mapping each parameter name, in the order
+    of f's arguments, to its values) and return an xarray Dataset of the
+    solutions at the times t_eval. Extra keyword arguments are passed to
+    solve_ivp. If stats is a dict, the number of points solved and the number
+    loaded from checkpoints are stored in it. Resuming from a checkpoint_dir
+    written by a different sweep raises ValueError.
+    """
+    names = list(grid)
+    values = [np.asarray(grid[name]) for name in names]
+    shape = tuple(len(v) for v in values)
+    n_points = int(np.prod(shape))
+    y0 = np.asarray(y0, dtype=np.float64)
+    t_eval = np.asarray(t_eval, dtype=np.float64)
+    state_names = state_names or [f"y{i}" for i in range(len(y0))]
+
+    y = np.full((n_points, len(y0), len(t_eval)), np.nan)
+    status = np.full(n_points, -2, dtype=int)
+    done = np.zeros(n_points, dtype=bool)
+    n_chunks = 0
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        _check_manifest(checkpoint_dir, _manifest(
+            f, names, values, y0, t_span, t_eval, solve_kwargs))
+        for number, indices, chunk_y, chunk_status in _load_checkpoints(
+                checkpoint_dir):
+            y[indices] = chunk_y
+            status[indices] = chunk_status
+            done[indices] = True
+            # number new chunks after the existing ones, never reusing a name
+            n_chunks = max(n_chunks, number + 1)
+    n_resumed = int(done.sum())
+
+    remaining = np.flatnonzero(~done)
+    chunks = [remaining[i:i+chunk_size]
+              for i in range(0, len(remaining), chunk_size)]
+    paths = itertools.repeat(None) if checkpoint_dir is None else (
+        os.path.join(checkpoint_dir, f"chunk_{n:06d}.npz")
+        for n in itertools.count(n_chunks))
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_solve_chunk, f, values, chunk, y0, t_span,
+                               t_eval, solve_kwargs, path)
+                   for chunk, path in zip(chunks, paths)]
+        for future in futures:
+            indices, chunk_y, chunk_status = future.result()
+            y[indices] = chunk_y
+            status[indices] = chunk_status
+
+    if stats is not None:
+        stats["solved"] = len(remaining)
+        stats["resumed"] = n_resumed
+
+    y = y.reshape(*shape, len(y0), len(t_eval))
+    data_vars = {name: ((*names, "t"), y[..., i, :])
+                 for i, name in enumerate(state_names)}
+    data_vars["status"] = (names, status.reshape(shape))
+    coords = dict(zip(names, values))
+    coords["t"] = t_eval
+    return xr.Dataset(data_vars, coords=coords)
+
+
+def cooling(t, y, k):
+    return -k*y
+
+def predator_prey(t, y, a, b, c, d):
+    return np.array(
+            [a*y[0] - b*y[1]*y[0],
+             c*y[1]*y[0] - d*y[1]])
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    t_eval = np.linspace(0, 10, 101)
+    ds = run_sweep(cooling, {"k": np.linspace(0.05, 0.5, 10)}, [50],
+                   (0, 10), t_eval, state_names=["T"], rtol=1e-8)
+    exact = 50*np.exp(-ds["k"]*ds["t"])
+    print(f"cooling: max error {float(abs(ds['T'] - exact).max()):.1e}")
+
+    grid = {"a": np.linspace(4, 6, 5), "b": np.linspace(0.05, 0.15, 5),
+            "c": np.linspace(0.05, 0.15, 5), "d": np.linspace(5, 7, 5)}
+    t_eval = np.linspace(0, 5, 51)
+    checkpoint_dir = tempfile.mkdtemp()
+    try:
+        stats = {}
+        ds = run_sweep(predator_prey, grid, [85, 40], (0, 5), t_eval,
+                       state_names=["P", "W"], checkpoint_dir=checkpoint_dir,
+                       stats=stats, max_step=0.01)
+        print(f"predator-prey: {stats}")
+
+        # simulate an interrupted sweep by removing some of the checkpoints
+        for path in sorted(glob.glob(
+                os.path.join(checkpoint_dir, "chunk_*.npz")))[-3:]:
+            os.remove(path)
+        resumed = run_sweep(predator_prey, grid, [85, 40], (0, 5), t_eval,
+                            state_names=["P", "W"],
+                            checkpoint_dir=checkpoint_dir, stats=stats,
+                            max_step=0.01)
+        print(f"resumed: {stats}, identical: {resumed.identical(ds)}")
+        try:
+            run_sweep(predator_prey, grid, [85, 40], (0, 5), t_eval,
+                      checkpoint_dir=checkpoint_dir, max_step=0.02)
+        except ValueError as error:
+            print(f"refused: {error}")
+        print(ds["P"].max("t").mean(["b", "c", "d"]).to_series())
+    finally:
+        shutil.rmtree(checkpoint_dir)
@@ -0,0 +1,37 @@
+"""
+Lookup of the kernels provided by the mandelbrot backends.
+
+Every backend module exposes a ``compute_tile(x_vals, y_vals, N_iter, out=None)``
+function that fills an (len(x_vals), len(y_vals)) int64 array of escape
+counts, and a ``compute_points(cx, cy, N_iter, out=None)`` function that does
+the same for 1-D arrays of scattered points. The compiled backends are only
+available once they have been built with
+``python setup.py build_ext --inplace``.
+"""
+import importlib
+
+BACKENDS = {
+    "python": "python_mandel",
+    "hybrid": "hybrid_mandel",
+    "numpy": "numpy_mandel",
+    "cython": "cython_mandel",
+    }
+
+def get_module(name):
+    return importlib.import_module(f"{__package__}.{BACKENDS[name]}")
+
+def get_kernel(name):
+    return get_module(name).compute_tile
+
+def get_point_kernel(name):
+    return get_module(name).compute_points
+
+def available():
+    names = []
+    for name in BACKENDS:
+        try:
+            get_module(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
@@ -0,0 +1,73 @@
+"""
+Imports and definitions for escape counts of arbitrary sets of points.
+
+``escape_times`` takes a 1-D complex128 array of points, or a pair of 1-D
+arrays of x and y coordinates, and streams it through the ``compute_points``
+kernel of a backend in chunks. Only one chunk of coordinates is converted at a
+time, so the inputs (and the output) can be memory-mapped arrays that are
+much larger than memory. By default the fastest available backend is used.
+"""
+import time
+import numpy as np
+
+from .backends import available, get_point_kernel
+
+FASTEST_FIRST = ("cython", "numpy", "hybrid", "python")
+
+def fastest_backend():
+    names = available()
+    return next(name for name in FASTEST_FIRST if name in names)
+
+def escape_times(x, y=None, N_iter=255, chunk_size=2**18, out=None,
+                 backend=None, fast=False, stats=None):
+    """
+    Compute the escape count of every point in x (complex), or (x, y).
+
+    out can be a (memory-mapped) int64 array of the same length to write into.
+    If stats is a dict, it is filled with the number of points, the time
+    taken and the number of points per second.
+    """
+    n_points = len(x)
+    if y is not None and len(y) != n_points:
+        raise ValueError("x and y must have the same length")
+    if out is None:
+        out = np.empty(n_points, dtype=np.int64)
+    kernel = get_point_kernel(backend or fastest_backend())
+
+    t_start = time.perf_counter()
+    for start in range(0, n_points, chunk_size):
+        stop = min(start + chunk_size, n_points)
+        if y is None:
+            chunk = np.asarray(x[start:stop], dtype=np.complex128)
+            cx = np.ascontiguousarray(chunk.real)
+            cy = np.ascontiguousarray(chunk.imag)
+        else:
+            cx = np.ascontiguousarray(x[start:stop], dtype=np.float64)
+            cy = np.ascontiguousarray(y[start:stop], dtype=np.float64)
+        out[start:stop] = kernel(cx, cy, N_iter, fast=fast)
+    elapsed = time.perf_counter() - t_start
+
+    if stats is not None:
+        stats["points"] = n_points
+        stats["seconds"] = elapsed
+        stats["points_per_second"] = n_points/elapsed if elapsed else np.inf
+    return out
+
+def estimate_area(n_points, N_iter=1000, chunk_size=2**18, seed=None,
+                  backend=None):
+    """
+    Monte Carlo estimate of the area of the Mandelbrot set, sampling points
+    uniformly from [-2, 0.5] x [-1.25, 1.25] one chunk at a time.
+    """
+    rng = np.random.default_rng(seed)
+    inside = 0
+    remaining = n_points
+    while remaining:
+        size = min(chunk_size, remaining)
+        cx = rng.uniform(-2.0, 0.5, size)
+        cy = rng.uniform(-1.25, 1.25, size)
+        counts = escape_times(cx, cy, N_iter, chunk_size, backend=backend,
+                              fast=True)
+        inside += np.count_nonzero(counts == N_iter)
+        remaining -= size
+    return 2.5*2.5*inside/n_points
@@ -0,0 +1,171 @@
+"""
+Benchmark suite for the mandelbrot backends.
+
+Each target is timed with ``time.perf_counter`` after a number of warmup runs,
+over a grid of frame sizes and iteration counts. The throughput is reported
+both in pixels per second and in escape iterations per second: the sum of
+the escape counts of the frame divided by the time. The sum of the escape
+counts is the number of iterations the plain escape-time loop performs, which
+makes frames with different amounts of interior comparable; the fast path and
+subdivision skip many of those iterations, so for them this is an effective
+rate rather than a count of the work done. Results
+can be written to JSON and compared against a stored baseline to catch
+slowdowns:
+
+    python -m mandelbrot.benchmark --output bench.json --baseline base.json
+"""
+import sys
+import json
+import importlib
+import time
+import argparse
+import platform
+import statistics
+import numpy as np
+
+from functools import partial
+
+from .backends import get_module
+
+def _targets():
+    def backend(name):
+        return lambda: get_module(name).compute_mandel
+
+    def variant(module, name, **kwargs):
+        def load():
+            mod = importlib.import_module(f"{__package__}.{module}")
+            return partial(getattr(mod, name), **kwargs)
+        return load
+
+    return {
+        "python": backend("python"),
+        "hybrid": backend("hybrid"),
+        "numpy": backend("numpy"),
+        "cython": backend("cython"),
+        "cython-prange": variant("cython_mandel", "compute_mandel_parallel"),
+        "cython-tiled": variant("tiled", "compute_mandel", backend="cython"),
+        "cython-subdivide": variant("subdivide", "compute_mandel",
+                                    backend="cython"),
+        }
+
+TARGETS = _targets()
+DEFAULT_TARGETS = ("hybrid", "numpy", "cython", "cython-prange")
+DEFAULT_SIZES = ((320, 240), (640, 480))
+DEFAULT_ITERATIONS = (255, 1000)
+
+def get_target(name):
+    return TARGETS[name]()
+
+def time_call(func, *args, warmup=1, repeat=5, **kwargs):
+    for _ in range(warmup):
+        func(*args, **kwargs)
+    times = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        result = func(*args, **kwargs)
+        times.append(time.perf_counter() - t_start)
+    return times, result
+
+def run(targets=DEFAULT_TARGETS, sizes=DEFAULT_SIZES,
+        iterations=DEFAULT_ITERATIONS, warmup=1, repeat=5):
+    results = []
+    for name in targets:
+        try:
+            func = get_target(name)
+        except ImportError as err:
+            print(f"Skipping {name}: {err}", file=sys.stderr)
+            continue
+        for N_x, N_y in sizes:
+            for N_iter in iterations:
+                times, height = time_call(func, N_x, N_y, N_iter,
+                                          warmup=warmup, repeat=repeat)
+                best = min(times)
+                results.append({
+                    "target": name,
+                    "N_x": N_x,
+                    "N_y": N_y,
+                    "N_iter": N_iter,
+                    "times": times,
+                    "best": best,
+                    "median": statistics.median(times),
+                    "mpix_per_s": N_x*N_y/best/1e6,
+                    "escape_iter_per_s": float(np.sum(height))/best,
+                    })
+    return results
+
+def _case(result):
+    return result["target"], result["N_x"], result["N_y"], result["N_iter"]
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Return the results whose best time is more than tolerance (as a fraction)
+    slower than the matching case of the baseline, with the slowdown ratio.
+    """
+    reference = {_case(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = reference.get(_case(result))
+        if base is None:
+            continue
+        ratio = result["best"]/base["best"]
+        if ratio > 1 + tolerance:
+            regressions.append((result, ratio))
+    return regressions
+
+def save(results, path):
+    document = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "results": results,
+        }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+def report(results):
+    for result in results:
+        print(f"{result['target']:>16} {result['N_x']:>5}x{result['N_y']:<5} "
+              f"{result['N_iter']:>6} iter: best {result['best']:.4f}s "
+              f"median {result['median']:.4f}s "
+              f"{result['mpix_per_s']:8.2f} Mpix/s "
+              f"{result['escape_iter_per_s']/1e6:9.2f} Miter/s (escape)")
+
+def _size(text):
+    N_x, N_y = text.lower().split("x")
+    return int(N_x), int(N_y)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--targets", nargs="+", default=DEFAULT_TARGETS,
+                        choices=sorted(TARGETS))
+    parser.add_argument("--sizes", nargs="+", type=_size,
+                        default=DEFAULT_SIZES, metavar="NXxNY")
+    parser.add_argument("--iterations", nargs="+", type=int,
+                        default=DEFAULT_ITERATIONS)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    results = run(args.targets, args.sizes, args.iterations, args.warmup,
+                  args.repeat)
+    report(results)
+    if args.output:
+        save(results, args.output)
+    if args.baseline:
+        regressions = compare(results, load(args.baseline), args.tolerance)
+        for result, ratio in regressions:
+            print(f"Regression: {result['target']} {result['N_x']}x"
+                  f"{result['N_y']} {result['N_iter']} iter is "
+                  f"{ratio:.2f}x slower than the baseline")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Imports and definitions for a tile cache in front of the mandelbrot backends.
+
+Frames are assembled from square tiles of pixels on a lattice that is fixed
+by the pixel spacing, so viewports that overlap at the same resolution share
+their tiles. The requested viewport is snapped to this lattice, which moves
+it by less than a pixel, so the frame is not the same as the one returned by
+``compute_mandel`` for the requested limits; ``render_snapped`` returns the
+limits that were actually used alongside the frame.
+
+Tiles are kept in two least-recently-used tiers, each with its own budget in
+bytes: an in-memory tier and an optional on-disk tier of ``.npy`` files that
+are read memory-mapped, without copying them into memory. Tiles evicted from
+memory are spilled to disk. The files are written under a temporary name and
+then renamed, so a crash never leaves a partial tile behind, and several
+caches may share a directory: a file that another cache has already evicted
+is treated as a miss.
+
+A tile stores the orbit state (x, y, count) of each of its pixels, as
+returned by the ``resume_tile`` function of the backend, and the number of
+iterations it was computed with. A request for fewer iterations is answered
+by clipping the counts, and a request for more iterations continues the
+orbits of the pixels that had not escaped from where they stopped.
+"""
+import os
+import hashlib
+import numpy as np
+
+from collections import OrderedDict
+
+from .backends import get_module
+
+STATE_DTYPE = np.dtype([("x", np.float64), ("y", np.float64),
+                        ("count", np.int32)])
+
+def _nbytes(state):
+    return sum(part.nbytes for part in state)
+
+class TileCache:
+
+    def __init__(self, backend="numpy", tile=64, memory_bytes=256*2**20,
+                 disk_bytes=2**30, directory=None):
+        self.backend = backend
+        self.tile = tile
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.directory = directory
+
+        self._resume = get_module(backend).resume_tile
+        self._memory = OrderedDict()  # key -> (max_iter, orbit state)
+        self._memory_used = 0
+        self._disk = OrderedDict()  # file stem -> (path, max_iter, nbytes)
+        self._disk_used = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._scan_disk()
+
+    def _scan_disk(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if ext != ".npy" or "_" not in stem:
+                continue
+            path = os.path.join(self.directory, name)
+            stem, max_iter = stem.rsplit("_", 1)
+            try:
+                # skip anything that is not a readable tile
+                if np.load(path, mmap_mode="r").dtype != STATE_DTYPE:
+                    continue
+                entries.append((os.path.getmtime(path), stem, path,
+                                int(max_iter), os.path.getsize(path)))
+            except Exception:
+                continue
+        for _, stem, path, max_iter, nbytes in sorted(entries):
+            self._disk[stem] = (path, max_iter, nbytes)
+            self._disk_used += nbytes
+
+    def _stem(self, key):
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def _store_memory(self, key, max_iter, state):
+        if key in self._memory:
+            self._memory_used -= _nbytes(self._memory.pop(key)[1])
+        self._memory[key] = (max_iter, state)
+        self._memory_used += _nbytes(state)
+        while self._memory_used > self.memory_bytes and len(self._memory) > 1:
+            old_key, (old_iter, old_state) = self._memory.popitem(last=False)
+            self._memory_used -= _nbytes(old_state)
+            self._store_disk(old_key, old_iter, old_state)
+
+    def _remove_disk(self, stem):
+        path, _, nbytes = self._disk.pop(stem)
+        self._disk_used -= nbytes
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # already evicted by another cache on the same directory
+
+    def _store_disk(self, key, max_iter, state):
+        if self.directory is None:
+            return
+        stem = self._stem(key)
+        if stem in self._disk:
+            if self._disk[stem][1] >= max_iter:
+                self._disk.move_to_end(stem)
+                return
+            self._remove_disk(stem)
+        path = os.path.join(self.directory, f"{stem}_{max_iter}.npy")
+        records = np.empty(state[2].shape, dtype=STATE_DTYPE)
+        records["x"], records["y"], records["count"] = state
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, records)
+        os.replace(tmp_path, path)
+        nbytes = os.path.getsize(path)
+        self._disk[stem] = (path, max_iter, nbytes)
+        self._disk_used += nbytes
+        while self._disk_used > self.disk_bytes and len(self._disk) > 1:
+            self._remove_disk(next(iter(self._disk)))
+
+    def _lookup(self, key):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        stem = self._stem(key)
+        if stem in self._disk:
+            path, max_iter, _ = self._disk[stem]
+            try:
+                records = np.load(path, mmap_mode="r")
+            except FileNotFoundError:
+                self._remove_disk(stem)
+                return None
+            self._disk.move_to_end(stem)
+            return max_iter, (records["x"], records["y"], records["count"])
+        return None
+
+    def get_tile(self, d_x, d_y, t_i, t_j, N_iter):
+        key = (self.backend, self.tile, d_x, d_y, t_i, t_j)
+        x_vals = np.arange(t_i*self.tile, (t_i + 1)*self.tile)*d_x
+        y_vals = np.arange(t_j*self.tile, (t_j + 1)*self.tile)*d_y
+
+        entry = self._lookup(key)
+        if entry is not None and entry[0] >= N_iter:
+            return np.minimum(entry[1][2], N_iter).astype(np.int64)
+        state = None if entry is None else entry[1]
+        values, state = self._resume(x_vals, y_vals, N_iter, state)
+        self._store_memory(key, N_iter, state)
+        return values
+
+    def render_snapped(self, N_x, N_y, N_iter, xlim_l=-2.5, xlim_u=0.5,
+                       ylim_l=-1.2, ylim_u=1.2):
+        """
+        Assemble the frame for the viewport snapped to the tile lattice.
+
+        Returns the escape counts and the snapped limits (xlim_l, xlim_u,
+        ylim_l, ylim_u) of the frame that was computed.
+        """
+        # Rounding the pixel spacing lets nearby viewports share a lattice
+        d_x = float(f"{(xlim_u - xlim_l)/max(N_x - 1, 1):.12g}")
+        d_y = float(f"{(ylim_u - ylim_l)/max(N_y - 1, 1):.12g}")
+        i_start = round(xlim_l/d_x)
+        j_start = round(ylim_l/d_y)
+        height = np.empty((N_x, N_y), dtype=np.int64)
+
+        tile = self.tile
+        for t_i in range(i_start // tile, (i_start + N_x - 1) // tile + 1):
+            i0 = max(t_i*tile, i_start)
+            i1 = min((t_i + 1)*tile, i_start + N_x)
+            for t_j in range(j_start // tile, (j_start + N_y - 1) // tile + 1):
+                j0 = max(t_j*tile, j_start)
+                j1 = min((t_j + 1)*tile, j_start + N_y)
+                values = self.get_tile(d_x, d_y, t_i, t_j, N_iter)
+                height[i0-i_start:i1-i_start, j0-j_start:j1-j_start] = \
+                    values[i0-t_i*tile:i1-t_i*tile, j0-t_j*tile:j1-t_j*tile]
+        limits = (i_start*d_x, (i_start + N_x - 1)*d_x,
+                  j_start*d_y, (j_start + N_y - 1)*d_y)
+        return height, limits
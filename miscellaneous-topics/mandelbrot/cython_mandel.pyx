@@ -1,14 +1,17 @@
 """
 Imports and definitions for the Cython version of mandelbrot.
 """
+import os
 import numpy as np
 cimport numpy as np
 cimport cython
 
+from cython.parallel cimport prange
+
 ctypedef Py_ssize_t Int
 ctypedef np.float64_t Double
 
-cdef int in_mandel(Double cx, Double cy, int max_iter):
+cdef int in_mandel(Double cx, Double cy, int max_iter) nogil:
     cdef Double x = cx
     cdef Double y = cy
     cdef Double x2, y2
@@ -23,21 +26,175 @@ cdef int in_mandel(Double cx, Double cy, int max_iter):
         x = x2 - y2 + cx
     return max_iter
 
+cdef bint in_interior(Double cx, Double cy) nogil:
+    # main cardioid and period-2 bulb
+    cdef Double q = (cx - 0.25)**2 + cy**2
+    if q*(q + (cx - 0.25)) < 0.25*cy**2:
+        return True
+    return (cx + 1.0)**2 + cy**2 < 0.0625
+
+cdef int in_mandel_fast(Double cx, Double cy, int max_iter) nogil:
+    cdef Double x = cx
+    cdef Double y = cy
+    cdef Double x2, y2
+    cdef Double x_old = cx
+    cdef Double y_old = cy
+    cdef Int i
+    cdef Int period = 0
+    cdef Int check = 8
+
+    if in_interior(cx, cy):
+        return max_iter
+
+    # Brent-style periodicity check, see python_mandel.in_mandel_fast
+    for i in range(max_iter):
+        x2 = x**2
+        y2 = y**2
+        if (x2 + y2) >= 4:
+            return i
+        y = 2.0*x*y + cy
+        x = x2 - y2 + cx
+        if x == x_old and y == y_old:
+            return max_iter
+        period += 1
+        if period == check:
+            period = 0
+            check *= 2
+            x_old = x
+            y_old = y
+    return max_iter
+
+cdef int in_mandel_state(Double cx, Double cy, Double *x, Double *y,
+                         int start, int max_iter) nogil:
+    cdef Double x2, y2
+    cdef Int i
+
+    for i in range(start, max_iter):
+        x2 = x[0]**2
+        y2 = y[0]**2
+        if (x2 + y2) >= 4:
+            return i
+        y[0] = 2.0*x[0]*y[0] + cy
+        x[0] = x2 - y2 + cx
+    return max_iter
+
+cdef inline int escape_count(Double cx, Double cy, int max_iter,
+                             bint fast) nogil:
+    if fast:
+        return in_mandel_fast(cx, cy, max_iter)
+    return in_mandel(cx, cy, max_iter)
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
-def compute_mandel(int N_x, int N_y, int N_iter):
-    cdef double xlim_l = -2.5
-    cdef double xlim_u = 0.5
-    cdef double ylim_l = -1.2
-    cdef double ylim_u = 1.2
-
+def compute_mandel(int N_x, int N_y, int N_iter, double xlim_l=-2.5,
+                   double xlim_u=0.5, double ylim_l=-1.2, double ylim_u=1.2,
+                   bint fast=False, state=None, bint return_state=False):
     cdef np.ndarray x_vals = np.linspace(xlim_l, xlim_u, N_x, dtype=np.float64)
     cdef np.ndarray y_vals = np.linspace(ylim_l, ylim_u, N_y, dtype=np.float64)
 
+    if state is not None or return_state:
+        if fast:
+            raise ValueError("The fast path does not keep the orbit state")
+        counts, state = resume_tile(x_vals, y_vals, N_iter, state)
+        if return_state:
+            return counts, state
+        return counts
+
     cdef np.ndarray height = np.empty((N_x, N_y), dtype=np.int64)
     cdef Int i, j
 
     for i in range(N_x):
         for j in range(N_y):
-            height[i, j] = in_mandel(x_vals[i], y_vals[j], N_iter)
+            height[i, j] = escape_count(x_vals[i], y_vals[j], N_iter, fast)
     return height
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def compute_points(const Double[:] cx, const Double[:] cy, int N_iter,
+                   out=None, bint fast=False):
+    if out is None:
+        out = np.empty(cx.shape[0], dtype=np.int64)
+
+    cdef np.int64_t[:] height = out
+    cdef Int k
+
+    with nogil:
+        for k in range(cx.shape[0]):
+            height[k] = escape_count(cx[k], cy[k], N_iter, fast)
+    return out
+
+def new_state(x_vals, y_vals):
+    x, y = np.meshgrid(x_vals, y_vals, indexing="ij")
+    return (x.astype(np.float64), y.astype(np.float64),
+            np.zeros(x.shape, dtype=np.int32))
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def resume_tile(const Double[:] x_vals, const Double[:] y_vals, int N_iter,
+                state=None):
+    """
+    Continue iterating from the orbit state (x, y, count) of every pixel.
+
+    See python_mandel.resume_tile.
+    """
+    if state is None:
+        state = new_state(x_vals, y_vals)
+    x_arr = np.array(state[0], dtype=np.float64)
+    y_arr = np.array(state[1], dtype=np.float64)
+    count_arr = np.array(state[2], dtype=np.int32)
+    out = np.empty(count_arr.shape, dtype=np.int64)
+
+    cdef Double[:, :] x = x_arr
+    cdef Double[:, :] y = y_arr
+    cdef np.int32_t[:, :] count = count_arr
+    cdef np.int64_t[:, :] height = out
+    cdef Int i, j
+    cdef int n
+
+    with nogil:
+        for i in range(x_vals.shape[0]):
+            for j in range(y_vals.shape[0]):
+                n = in_mandel_state(x_vals[i], y_vals[j], &x[i, j], &y[i, j],
+                                    count[i, j], N_iter)
+                height[i, j] = n
+                if n > count[i, j]:
+                    count[i, j] = n
+    return out, (x_arr, y_arr, count_arr)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def compute_tile(const Double[:] x_vals, const Double[:] y_vals, int N_iter,
+                 out=None, bint fast=False):
+    if out is None:
+        out = np.empty((x_vals.shape[0], y_vals.shape[0]), dtype=np.int64)
+
+    cdef np.int64_t[:, :] height = out
+    cdef Int i, j
+
+    with nogil:
+        for i in range(x_vals.shape[0]):
+            for j in range(y_vals.shape[0]):
+                height[i, j] = escape_count(x_vals[i], y_vals[j], N_iter, fast)
+    return out
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def compute_mandel_parallel(int N_x, int N_y, int N_iter, double xlim_l=-2.5,
+                            double xlim_u=0.5, double ylim_l=-1.2,
+                            double ylim_u=1.2, int num_threads=0,
+                            bint fast=False):
+    cdef Double[::1] x_vals = np.linspace(xlim_l, xlim_u, N_x, dtype=np.float64)
+    cdef Double[::1] y_vals = np.linspace(ylim_l, ylim_u, N_y, dtype=np.float64)
+
+    out = np.empty((N_x, N_y), dtype=np.int64)
+    cdef np.int64_t[:, ::1] height = out
+    cdef Int i, j
+
+    if num_threads <= 0:
+        num_threads = os.cpu_count()
+
+    for i in prange(N_x, nogil=True, schedule="dynamic",
+                    num_threads=num_threads):
+        for j in range(N_y):
+            height[i, j] = escape_count(x_vals[i], y_vals[j], N_iter, fast)
+    return out
@@ -0,0 +1,175 @@
+"""
+Imports and definitions for the vectorized NumPy version of mandelbrot.
+
+Instead of iterating one point at a time, the whole working set of points is
+iterated at once. Points that escape are recorded and removed from the working
+set (compacted) so that later iterations only touch the points that are still
+bounded.
+"""
+import numpy as np
+
+def in_interior(cx, cy):
+    # main cardioid and period-2 bulb
+    q = (cx - 0.25)**2 + cy**2
+    return (q*(q + (cx - 0.25)) < 0.25*cy**2) | ((cx + 1.0)**2 + cy**2 < 0.0625)
+
+def in_mandel_fast(cx, cy, max_iter):
+    cx, cy = np.broadcast_arrays(np.asarray(cx, dtype=np.float64),
+                                 np.asarray(cy, dtype=np.float64))
+    shape = cx.shape
+    cx = cx.ravel()
+    cy = cy.ravel()
+
+    height = np.full(cx.size, max_iter, dtype=np.int64)
+    outside = ~in_interior(cx, cy)
+    idx = np.flatnonzero(outside)
+    cx, cy = cx[outside], cy[outside]
+    x = cx.copy()
+    y = cy.copy()
+    # Brent-style periodicity check, see python_mandel.in_mandel_fast
+    x_old = x.copy()
+    y_old = y.copy()
+    period = 0
+    check = 8
+
+    for i in range(max_iter):
+        if not idx.size:
+            break
+        x2 = x*x
+        y2 = y*y
+        escaped = (x2 + y2) >= 4
+        if escaped.any():
+            height[idx[escaped]] = i
+            bounded = ~escaped
+            idx = idx[bounded]
+            cx, cy = cx[bounded], cy[bounded]
+            x, y = x[bounded], y[bounded]
+            x2, y2 = x2[bounded], y2[bounded]
+            x_old, y_old = x_old[bounded], y_old[bounded]
+        y = 2.0*x*y + cy
+        x = x2 - y2 + cx
+
+        cycled = (x == x_old) & (y == y_old)
+        if cycled.any():
+            # height is already max_iter for these points
+            bounded = ~cycled
+            idx = idx[bounded]
+            cx, cy = cx[bounded], cy[bounded]
+            x, y = x[bounded], y[bounded]
+            x_old, y_old = x_old[bounded], y_old[bounded]
+        period += 1
+        if period == check:
+            period = 0
+            check *= 2
+            x_old = x.copy()
+            y_old = y.copy()
+    return height.reshape(shape)
+
+def in_mandel(cx, cy, max_iter, fast=False, dtype=np.float64):
+    if fast:
+        return in_mandel_fast(cx, cy, max_iter)
+    cx, cy = np.broadcast_arrays(np.asarray(cx, dtype=dtype),
+                                 np.asarray(cy, dtype=dtype))
+    shape = cx.shape
+    cx = cx.ravel()
+    cy = cy.ravel()
+
+    height = np.full(cx.size, max_iter, dtype=np.int64)
+    idx = np.arange(cx.size)
+    x = cx.copy()
+    y = cy.copy()
+
+    for i in range(max_iter):
+        if not idx.size:
+            break
+        x2 = x*x
+        y2 = y*y
+        escaped = (x2 + y2) >= 4
+        if escaped.any():
+            height[idx[escaped]] = i
+            bounded = ~escaped
+            idx = idx[bounded]
+            cx, cy = cx[bounded], cy[bounded]
+            x, y = x[bounded], y[bounded]
+            x2, y2 = x2[bounded], y2[bounded]
+        y = 2.0*x*y + cy
+        x = x2 - y2 + cx
+    return height.reshape(shape)
+
+def compute_mandel(N_x, N_y, N_iter, xlim_l=-2.5, xlim_u=0.5, ylim_l=-1.2,
+                   ylim_u=1.2, fast=False, state=None, return_state=False):
+    x_vals = np.linspace(xlim_l, xlim_u, N_x, dtype=np.float64)
+    y_vals = np.linspace(ylim_l, ylim_u, N_y, dtype=np.float64)
+    if state is None and not return_state:
+        return compute_tile(x_vals, y_vals, N_iter, fast=fast)
+    if fast:
+        raise ValueError("The fast path does not keep the orbit state")
+
+    height, state = resume_tile(x_vals, y_vals, N_iter, state)
+    if return_state:
+        return height, state
+    return height
+
+def compute_points(cx, cy, N_iter, out=None, fast=False):
+    height = in_mandel(cx, cy, N_iter, fast)
+    if out is None:
+        return height
+    out[...] = height
+    return out
+
+def new_state(x_vals, y_vals):
+    x, y = np.meshgrid(x_vals, y_vals, indexing="ij")
+    return (x.astype(np.float64), y.astype(np.float64),
+            np.zeros(x.shape, dtype=np.int32))
+
+def resume_tile(x_vals, y_vals, N_iter, state=None):
+    """
+    Continue iterating from the orbit state (x, y, count) of every pixel.
+
+    See python_mandel.resume_tile. Only the pixels that are still iterating
+    are kept in the working set.
+    """
+    if state is None:
+        state = new_state(x_vals, y_vals)
+    x = np.array(state[0], dtype=np.float64)
+    y = np.array(state[1], dtype=np.float64)
+    count = np.array(state[2], dtype=np.int32)
+    height = np.minimum(count, N_iter).astype(np.int64)
+
+    cx, cy = np.meshgrid(x_vals, y_vals, indexing="ij")
+    x_flat, y_flat = x.reshape(-1), y.reshape(-1)
+    count_flat, height_flat = count.reshape(-1), height.reshape(-1)
+
+    idx = np.flatnonzero(count_flat < N_iter)
+    cx, cy = cx.reshape(-1)[idx], cy.reshape(-1)[idx]
+    zx, zy = x_flat[idx], y_flat[idx]
+    n = count_flat[idx]
+
+    while idx.size:
+        x2 = zx*zx
+        y2 = zy*zy
+        done = (n >= N_iter) | ((x2 + y2) >= 4)
+        if done.any():
+            finished = idx[done]
+            x_flat[finished] = zx[done]
+            y_flat[finished] = zy[done]
+            count_flat[finished] = n[done]
+            height_flat[finished] = n[done]
+            running = ~done
+            idx = idx[running]
+            cx, cy = cx[running], cy[running]
+            zx, zy = zx[running], zy[running]
+            x2, y2 = x2[running], y2[running]
+            n = n[running]
+        zy = 2.0*zx*zy + cy
+        zx = x2 - y2 + cx
+        n += 1
+    return height, (x, y, count)
+
+def compute_tile(x_vals, y_vals, N_iter, out=None, fast=False):
+    cx, cy = np.meshgrid(x_vals, y_vals, indexing="ij")
+    height = in_mandel(cx, cy, N_iter, fast)
+    if out is None:
+        return height
+    out[...] = height
+    return out
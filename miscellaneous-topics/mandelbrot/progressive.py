@@ -0,0 +1,69 @@
+"""
+Imports and definitions for progressive rendering of mandelbrot.
+
+Rather than waiting for the whole frame, ``render_progressive`` is a generator
+that first yields a coarse image, computed on every step-th pixel, at its own
+resolution: each of its pixels stands for a step by step block of the frame.
+The initial step is chosen so that the first pass computes at most
+``first_pixels`` pixels, and nothing of the size of the full frame is touched
+before the coarse image is yielded, so the time to the first image does not
+depend on the size of the frame. Each following pass halves the step and
+computes only the pixels that are new on the finer grid (interlacing), so no
+pixel is ever computed twice.
+
+The refinement passes are split into bands of rows. After each band the
+generator yields the full-size frame together with the (rows, cols) slices
+that have changed, so a display only has to redraw that region (the frame
+outside the bands refined so far is not yet filled in; a display keeps
+showing the scaled coarse image there). Each yield is an (image, (rows, cols),
+scale) triple, where scale is the step of the coarse image and 1 for the
+frame. The same frame array is updated in place and yielded every time; copy
+it to keep an intermediate frame. The last frame is identical to the one
+computed by ``compute_mandel``.
+"""
+import numpy as np
+
+from .backends import get_kernel
+
+def _fill_blocks(frame, rows, step):
+    # Paint each pixel of the step grid over the step by step block below it
+    n_rows = rows.stop - rows.start
+    grid = frame[rows.start:rows.stop:step, ::step]
+    blocks = np.repeat(np.repeat(grid, step, axis=0), step, axis=1)
+    frame[rows] = blocks[:n_rows, :frame.shape[1]]
+
+def render_progressive(N_x, N_y, N_iter, xlim_l=-2.5, xlim_u=0.5, ylim_l=-1.2,
+                       ylim_u=1.2, backend="numpy", first_pixels=4096,
+                       band_pixels=65536, fast=False):
+    x_vals = np.linspace(xlim_l, xlim_u, N_x, dtype=np.float64)
+    y_vals = np.linspace(ylim_l, ylim_u, N_y, dtype=np.float64)
+    kernel = get_kernel(backend)
+
+    step = 1
+    while -(-N_x // step) * -(-N_y // step) > first_pixels:
+        step *= 2
+
+    coarse = kernel(x_vals[::step], y_vals[::step], N_iter, fast=fast)
+    yield coarse, (slice(0, N_x), slice(0, N_y)), step
+
+    # np.empty does not touch the memory, so only the pages written by the
+    # coarse grid and by each band are paid for, as they are reached
+    frame = np.empty((N_x, N_y), dtype=np.int64)
+    frame[::step, ::step] = coarse
+    while step > 1:
+        half = step // 2
+        new_per_row = -(-N_y // half)
+        band = max(step, (band_pixels // new_per_row) * half // step * step)
+
+        for i0 in range(0, N_x, band):
+            i1 = min(i0 + band, N_x)
+            # rows that are new on the finer grid
+            kernel(x_vals[i0+half:i1:step], y_vals[::half], N_iter,
+                   out=frame[i0+half:i1:step, ::half], fast=fast)
+            # new columns of the rows that are already on the coarser grid
+            kernel(x_vals[i0:i1:step], y_vals[half::step], N_iter,
+                   out=frame[i0:i1:step, half::step], fast=fast)
+            rows = slice(i0, i1)
+            _fill_blocks(frame, rows, half)
+            yield frame, (rows, slice(0, N_y)), 1
+        step = half
@@ -3,9 +3,25 @@ Imports and definitions for the Python version of mandelbrot
 """
 import numpy as np
 
-def in_mandel(cx, cy, max_iter):
+def in_interior(cx, cy):
+    # main cardioid and period-2 bulb
+    q = (cx - 0.25)**2 + cy**2
+    if q*(q + (cx - 0.25)) < 0.25*cy**2:
+        return True
+    return (cx + 1.0)**2 + cy**2 < 0.0625
+
+def in_mandel_fast(cx, cy, max_iter):
+    if in_interior(cx, cy):
+        return max_iter
     x = cx
     y = cy
+    # Brent-style periodicity check: compare against a saved point that is
+    # refreshed after 8, 16, 32, ... iterations. An exact repeat means the
+    # orbit is periodic and will never escape.
+    x_old = x
+    y_old = y
+    period = 0
+    check = 8
     for i in range(max_iter):
         x2 = x**2
         y2 = y**2
@@ -13,18 +29,96 @@ def in_mandel(cx, cy, max_iter):
             return i
         y = 2.0*x*y + cy
         x = x2 - y2 + cx
+        if x == x_old and y == y_old:
+            return max_iter
+        period += 1
+        if period == check:
+            period = 0
+            check *= 2
+            x_old = x
+            y_old = y
     return max_iter
 
-def compute_mandel(N_x, N_y, N_iter):
-    xlim_l = -2.5
-    xlim_u = 0.5
-    ylim_l = -1.2
-    ylim_u = 1.2
+def in_mandel(cx, cy, max_iter, fast=False):
+    if fast:
+        return in_mandel_fast(cx, cy, max_iter)
+    x = cx
+    y = cy
+    for i in range(max_iter):
+        x2 = x**2
+        y2 = y**2
+        if (x2 + y2) >= 4:
+            return i
+        y = 2.0*x*y + cy
+        x = x2 - y2 + cx
+    return max_iter
+
+def in_mandel_state(cx, cy, x, y, start, max_iter):
+    for i in range(start, max_iter):
+        x2 = x**2
+        y2 = y**2
+        if (x2 + y2) >= 4:
+            return i, x, y
+        y = 2.0*x*y + cy
+        x = x2 - y2 + cx
+    return max_iter, x, y
+
+def compute_mandel(N_x, N_y, N_iter, xlim_l=-2.5, xlim_u=0.5, ylim_l=-1.2,
+                   ylim_u=1.2, fast=False, state=None, return_state=False):
     x_vals = np.linspace(xlim_l, xlim_u, N_x, dtype=np.float64)
     y_vals = np.linspace(ylim_l, ylim_u, N_y, dtype=np.float64)
-    height = np.empty((N_x, N_y), dtype=np.int64)
+    if state is None and not return_state:
+        return compute_tile(x_vals, y_vals, N_iter, fast=fast)
+    if fast:
+        raise ValueError("The fast path does not keep the orbit state")
 
-    for i in range(N_x):
-        for j in range(N_y):
-            height[i, j] = in_mandel(x_vals[i], y_vals[j], N_iter)
+    height, state = resume_tile(x_vals, y_vals, N_iter, state)
+    if return_state:
+        return height, state
     return height
+
+def new_state(x_vals, y_vals):
+    x, y = np.meshgrid(x_vals, y_vals, indexing="ij")
+    return (x.astype(np.float64), y.astype(np.float64),
+            np.zeros(x.shape, dtype=np.int32))
+
+def resume_tile(x_vals, y_vals, N_iter, state=None):
+    """
+    Continue iterating from the orbit state (x, y, count) of every pixel.
+
+    The state arrays have shape (len(x_vals), len(y_vals)) and are float64,
+    float64 and int32; by default every orbit starts at its pixel. Only the
+    pixels that have not escaped and have fewer than N_iter iterations do
+    any work. Returns the escape counts and the updated state.
+    """
+    if state is None:
+        state = new_state(x_vals, y_vals)
+    x = np.array(state[0], dtype=np.float64)
+    y = np.array(state[1], dtype=np.float64)
+    count = np.array(state[2], dtype=np.int32)
+    height = np.empty(count.shape, dtype=np.int64)
+
+    for i in range(len(x_vals)):
+        for j in range(len(y_vals)):
+            n, x[i, j], y[i, j] = in_mandel_state(
+                x_vals[i], y_vals[j], x[i, j], y[i, j], count[i, j], N_iter)
+            height[i, j] = n
+            count[i, j] = max(count[i, j], n)
+    return height, (x, y, count)
+
+def compute_tile(x_vals, y_vals, N_iter, out=None, fast=False):
+    if out is None:
+        out = np.empty((len(x_vals), len(y_vals)), dtype=np.int64)
+
+    for i in range(len(x_vals)):
+        for j in range(len(y_vals)):
+            out[i, j] = in_mandel(x_vals[i], y_vals[j], N_iter, fast)
+    return out
+
+def compute_points(cx, cy, N_iter, out=None, fast=False):
+    if out is None:
+        out = np.empty(len(cx), dtype=np.int64)
+
+    for k in range(len(cx)):
+        out[k] = in_mandel(cx[k], cy[k], N_iter, fast)
+    return out
@@ -1,11 +1,47 @@
 """
 The setup file where Python will make the C builds.
+
+The cython backend runs its rows in parallel with OpenMP. The flag that turns
+OpenMP on depends on the compiler (/openmp for MSVC, -fopenmp for gcc), and
+other compilers, such as Apple's clang, get no flag; Cython then compiles
+prange as an ordinary serial loop, so the build still works.
 """
+import subprocess
 import numpy as np
 
 from setuptools import setup, Extension
+from setuptools.command.build_ext import build_ext
 from Cython.Build import cythonize
 
+# the extensions that use prange
+OPENMP = {"cython_mandel"}
+
+def openmp_flag(compiler):
+    if compiler.compiler_type == "msvc":
+        return "/openmp"
+    if compiler.compiler_type in ("unix", "mingw32", "cygwin"):
+        try:
+            version = subprocess.run(
+                [compiler.compiler_so[0], "--version"], capture_output=True,
+                text=True).stdout
+        except OSError:
+            return None
+        if "clang" not in version and ("gcc" in version.lower()
+                                       or "Free Software Foundation" in version):
+            return "-fopenmp"
+    return None
+
+class BuildExt(build_ext):
+
+    def build_extensions(self):
+        flag = openmp_flag(self.compiler)
+        for ext in self.extensions:
+            if flag is not None and ext.name in OPENMP:
+                ext.extra_compile_args.append(flag)
+                if self.compiler.compiler_type != "msvc":
+                    ext.extra_link_args.append(flag)
+        super().build_extensions()
+
 hybrid = Extension(
     "hybrid_mandel",
     sources=["python_mandel.py"],
@@ -16,10 +52,11 @@ cython = Extension(
     "cython_mandel",
     sources=["cython_mandel.pyx"],
     include_dirs=[np.get_include()],
-     define_macros=[("NPY_NO_DEPRECATED_API", "NPY_1_7_API_VERSION")])
+    define_macros=[("NPY_NO_DEPRECATED_API", "NPY_1_7_API_VERSION")])
 
 extensions = [hybrid, cython]
 setup(
     ext_modules = cythonize(extensions,
                             compiler_directives={"language_level": "3"}),
+    cmdclass={"build_ext": BuildExt},
     )
@@ -0,0 +1,78 @@
+"""
+Imports and definitions for the subdivision (Mariani-Silver) version of
+mandelbrot.
+
+Large parts of an image of the Mandelbrot set are regions where every pixel
+has the same escape count. Starting from the border of the frame, the escape
+counts are computed along the border of a rectangle. If every pixel on the
+border has the same count, the whole rectangle is filled with that count
+without evaluating its interior. Otherwise the rectangle is split into four
+along its middle row and column, which are computed, and each of the four
+parts is treated in the same way. Rectangles that become small are evaluated
+in full.
+
+The pixels are evaluated by the ``compute_tile`` kernel of one of the
+backends. Since the kernel is called once per strip, the compiled backends
+are much better suited than the NumPy one. Filling is exact for connected
+regions but can miss thin filaments that cross a rectangle without touching
+its border, so ``verify=True`` compares the result against a full evaluation
+of the frame.
+"""
+import warnings
+import numpy as np
+
+from .backends import get_kernel
+
+def compute_mandel(N_x, N_y, N_iter, xlim_l=-2.5, xlim_u=0.5, ylim_l=-1.2,
+                   ylim_u=1.2, backend="numpy", min_size=8, fast=False,
+                   verify=False):
+    x_vals = np.linspace(xlim_l, xlim_u, N_x, dtype=np.float64)
+    y_vals = np.linspace(ylim_l, ylim_u, N_y, dtype=np.float64)
+    kernel = get_kernel(backend)
+    height = np.empty((N_x, N_y), dtype=np.int64)
+
+    def evaluate(rows, cols):
+        kernel(x_vals[rows], y_vals[cols], N_iter, out=height[rows, cols],
+               fast=fast)
+
+    # Rectangles are given by the indices of their border rows and columns,
+    # which are always computed before the rectangle is put on the stack.
+    i0, i1, j0, j1 = 0, N_x - 1, 0, N_y - 1
+    evaluate(slice(i0, i0 + 1), slice(j0, j1 + 1))
+    evaluate(slice(i1, i1 + 1), slice(j0, j1 + 1))
+    evaluate(slice(i0, i1 + 1), slice(j0, j0 + 1))
+    evaluate(slice(i0, i1 + 1), slice(j1, j1 + 1))
+    stack = [(i0, i1, j0, j1)]
+
+    while stack:
+        i0, i1, j0, j1 = stack.pop()
+        if i1 - i0 < 2 or j1 - j0 < 2:
+            continue
+        interior = (slice(i0 + 1, i1), slice(j0 + 1, j1))
+
+        value = height[i0, j0]
+        if ((height[i0, j0:j1+1] == value).all()
+                and (height[i1, j0:j1+1] == value).all()
+                and (height[i0:i1+1, j0] == value).all()
+                and (height[i0:i1+1, j1] == value).all()):
+            height[interior] = value
+            continue
+
+        if i1 - i0 <= min_size or j1 - j0 <= min_size:
+            evaluate(*interior)
+            continue
+
+        i_m = (i0 + i1) // 2
+        j_m = (j0 + j1) // 2
+        evaluate(slice(i_m, i_m + 1), interior[1])
+        evaluate(interior[0], slice(j_m, j_m + 1))
+        stack.extend([(i0, i_m, j0, j_m), (i0, i_m, j_m, j1),
+                      (i_m, i1, j0, j_m), (i_m, i1, j_m, j1)])
+
+    if verify:
+        full = kernel(x_vals, y_vals, N_iter, fast=fast)
+        mismatched = np.count_nonzero(full != height)
+        if mismatched:
+            warnings.warn(f"Subdivision differs from full evaluation in "
+                          f"{mismatched} of {height.size} pixels")
+    return height
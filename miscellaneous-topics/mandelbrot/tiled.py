@@ -0,0 +1,93 @@
+"""
+Imports and definitions for the tiled, multi-core version of mandelbrot.
+
+The (N_x, N_y) grid is split into tiles that are handed out to a pool of
+workers. Tiles are small compared to the frame and are pulled from the pool's
+queue as workers become free, so the expensive tiles near the boundary of the
+set do not hold up the rest of the frame. Each tile is computed by the
+``compute_tile`` kernel of a backend on exactly the same coordinates as the
+serial ``compute_mandel``, so the output is bit-identical.
+
+Threads are only useful for kernels that release the GIL (the Cython kernel);
+the other backends run on a process pool writing into shared memory.
+"""
+import os
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+from .backends import get_kernel
+
+def tiles(N_x, N_y, tile=(32, 32)):
+    t_x, t_y = tile
+    for i in range(0, N_x, t_x):
+        for j in range(0, N_y, t_y):
+            yield i, min(i + t_x, N_x), j, min(j + t_y, N_y)
+
+def _compute_shared(backend, name, shape, x_vals, y_vals, N_iter, i, j,
+                    fast):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        height = np.ndarray(shape, dtype=np.int64, buffer=shm.buf)
+        get_kernel(backend)(x_vals, y_vals, N_iter,
+                            out=height[i:i+len(x_vals), j:j+len(y_vals)],
+                            fast=fast)
+        del height
+    finally:
+        shm.close()
+
+def _run_threads(backend, x_vals, y_vals, N_iter, tile, workers, fast):
+    kernel = get_kernel(backend)
+    height = np.empty((len(x_vals), len(y_vals)), dtype=np.int64)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(kernel, x_vals[i0:i1], y_vals[j0:j1], N_iter,
+                               out=height[i0:i1, j0:j1], fast=fast)
+                   for i0, i1, j0, j1 in tiles(*height.shape, tile)]
+        for future in wait(futures).done:
+            future.result()
+    return height
+
+def _run_processes(backend, x_vals, y_vals, N_iter, tile, workers, fast):
+    shape = (len(x_vals), len(y_vals))
+    shm = shared_memory.SharedMemory(
+        create=True, size=max(1, shape[0]*shape[1]*8))
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_compute_shared, backend, shm.name, shape,
+                                   x_vals[i0:i1], y_vals[j0:j1], N_iter,
+                                   i0, j0, fast)
+                       for i0, i1, j0, j1 in tiles(*shape, tile)]
+            for future in wait(futures).done:
+                future.result()
+        height = np.ndarray(shape, dtype=np.int64, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return height
+
+def compute_mandel(N_x, N_y, N_iter, xlim_l=-2.5, xlim_u=0.5, ylim_l=-1.2,
+                   ylim_u=1.2, backend="numpy", tile=(32, 32), workers=None,
+                   executor=None, fast=False):
+    """
+    Compute the mandelbrot escape counts on a pool of workers.
+
+    executor is either "thread" or "process"; by default threads are used for
+    the Cython backend (which releases the GIL) and processes otherwise.
+    """
+    x_vals = np.linspace(xlim_l, xlim_u, N_x, dtype=np.float64)
+    y_vals = np.linspace(ylim_l, ylim_u, N_y, dtype=np.float64)
+
+    if workers is None:
+        workers = os.cpu_count()
+    if executor is None:
+        executor = "thread" if backend == "cython" else "process"
+
+    if executor == "thread":
+        return _run_threads(backend, x_vals, y_vals, N_iter, tile, workers,
+                            fast)
+    if executor == "process":
+        return _run_processes(backend, x_vals, y_vals, N_iter, tile, workers,
+                              fast)
+    raise ValueError(f"Unknown executor {executor!r}")
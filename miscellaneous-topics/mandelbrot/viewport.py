@@ -0,0 +1,74 @@
+"""
+Imports and definitions for rendering arbitrary viewports of mandelbrot.
+
+A viewport is a window (xlim_l, xlim_u, ylim_l, ylim_u) of the complex plane
+that is sampled on an N_x by N_y grid of pixels, using the same pixel
+coordinates as ``compute_mandel``. Any sub-rectangle of the frame can be
+rendered into a caller-provided array, so a viewer that pans only has to
+recompute the strips of pixels that are newly exposed.
+"""
+import numpy as np
+
+from .backends import get_kernel
+
+DEFAULT_VIEWPORT = (-2.5, 0.5, -1.2, 1.2)
+
+def pixel_coords(N_x, N_y, viewport=DEFAULT_VIEWPORT):
+    xlim_l, xlim_u, ylim_l, ylim_u = viewport
+    x_vals = np.linspace(xlim_l, xlim_u, N_x, dtype=np.float64)
+    y_vals = np.linspace(ylim_l, ylim_u, N_y, dtype=np.float64)
+    return x_vals, y_vals
+
+def render_region(N_x, N_y, N_iter, viewport=DEFAULT_VIEWPORT,
+                  rows=slice(None), cols=slice(None), out=None,
+                  backend="numpy", fast=False):
+    """
+    Render the pixels frame[rows, cols] of the viewport into out.
+
+    out must have shape (N_x, N_y); a new array is allocated if it is not
+    given. Pixels outside of the region are left untouched.
+    """
+    x_vals, y_vals = pixel_coords(N_x, N_y, viewport)
+    if out is None:
+        out = np.empty((N_x, N_y), dtype=np.int64)
+    if out.shape != (N_x, N_y):
+        raise ValueError(f"out has shape {out.shape}, expected {(N_x, N_y)}")
+
+    get_kernel(backend)(x_vals[rows], y_vals[cols], N_iter,
+                        out=out[rows, cols], fast=fast)
+    return out
+
+def _shift_slices(n, shift):
+    # (destination, source, exposed) slices for moving n pixels by shift
+    shift = max(-n, min(n, shift))
+    if shift >= 0:
+        return slice(0, n - shift), slice(shift, n), slice(n - shift, n)
+    return slice(-shift, n), slice(0, n + shift), slice(0, -shift)
+
+def pan(frame, shift_x, shift_y, N_iter, viewport=DEFAULT_VIEWPORT,
+        backend="numpy", fast=False):
+    """
+    Move the viewport of frame by a whole number of pixels.
+
+    The overlap with the old frame is copied across and only the exposed
+    strips are computed. Returns the new frame and its viewport. The copied
+    pixels keep the coordinates of the old grid, which can differ from a
+    fresh render of the new viewport in the last bit.
+    """
+    N_x, N_y = frame.shape
+    xlim_l, xlim_u, ylim_l, ylim_u = viewport
+    d_x = (xlim_u - xlim_l)/max(N_x - 1, 1)
+    d_y = (ylim_u - ylim_l)/max(N_y - 1, 1)
+    new_viewport = (xlim_l + shift_x*d_x, xlim_u + shift_x*d_x,
+                    ylim_l + shift_y*d_y, ylim_u + shift_y*d_y)
+
+    dst_x, src_x, exp_x = _shift_slices(N_x, shift_x)
+    dst_y, src_y, exp_y = _shift_slices(N_y, shift_y)
+
+    out = np.empty_like(frame)
+    out[dst_x, dst_y] = frame[src_x, src_y]
+    render_region(N_x, N_y, N_iter, new_viewport, rows=exp_x, out=out,
+                  backend=backend, fast=fast)
+    render_region(N_x, N_y, N_iter, new_viewport, rows=dst_x, cols=exp_y,
+                  out=out, backend=backend, fast=fast)
+    return out, new_viewport
@@ -14,36 +14,28 @@ and compiled for great performance improvements.
 This module illustrates how to use Cython to greatly improve the performance of
 code to generate an image of the Mandelbrot set.
 """
-import time
 import matplotlib.pyplot as plt
 
-from functools import wraps
+from mandelbrot.benchmark import get_target, time_call
+from mandelbrot.subdivide import compute_mandel as compute_mandel_sd
 
-from mandelbrot.python_mandel import compute_mandel as compute_mandel_py
-from mandelbrot.hybrid_mandel import compute_mandel as compute_mandel_hy
-from mandelbrot.cython_mandel import compute_mandel as compute_mandel_cy
-
-def timer(func, name):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        t_start = time.time()
-        val = func(*args, **kwargs)
-        t_end = time.time()
-        print(f"Time taken for {name}: {t_end - t_start}")
-        return val
-    return wrapper
-
-mandel_py = timer(compute_mandel_py, "Python")
-mandel_hy = timer(compute_mandel_hy, "Hybrid")
-mandel_cy = timer(compute_mandel_cy, "Cython")
+def timed(name, *args):
+    times, val = time_call(get_target(name), *args, warmup=1, repeat=3)
+    print(f"Time taken for {name}: {min(times):.4f}s (best of {len(times)})")
+    return val
 
 Nx = 320
 Ny = 240
 steps = 255
 
-mandel_py(Nx, Ny, steps)
-mandel_hy(Nx, Ny, steps)
-vals = mandel_cy(Nx, Ny, steps)
+timed("python", Nx, Ny, steps)
+timed("hybrid", Nx, Ny, steps)
+timed("numpy", Nx, Ny, steps)
+vals = timed("cython", Nx, Ny, steps)
+timed("cython-prange", Nx, Ny, steps)
+timed("cython-tiled", Nx, Ny, steps)
+timed("cython-subdivide", Nx, Ny, steps)
+compute_mandel_sd(Nx, Ny, steps, backend="cython", verify=True)
 
 fig, ax = plt.subplots()
 ax.imshow(vals.T, extent=(-2.5, 0.5, -1.2, 1.2))
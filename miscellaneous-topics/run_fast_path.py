@@ -0,0 +1,34 @@
+"""
+Most of the time spent computing an image of the Mandelbrot set goes into the
+points that lie inside the set, because these run for the full number of
+iterations. Many of them can be identified much sooner: the main cardioid and
+the period-2 bulb can be tested for directly, and an orbit that returns
+exactly to a point it has visited before is periodic and so never escapes.
+
+This module compares the escape counts and timings of the backends with and
+without these shortcuts as the number of iterations grows.
+"""
+import time
+import numpy as np
+
+from mandelbrot.backends import available, get_module
+
+Nx = 320
+Ny = 240
+backends = [name for name in ("numpy", "cython") if name in available()]
+
+for steps in (255, 1000, 4000, 10000):
+    for name in backends:
+        compute_mandel = get_module(name).compute_mandel
+
+        t_start = time.perf_counter()
+        exact = compute_mandel(Nx, Ny, steps)
+        t_exact = time.perf_counter() - t_start
+
+        t_start = time.perf_counter()
+        fast = compute_mandel(Nx, Ny, steps, fast=True)
+        t_fast = time.perf_counter() - t_start
+
+        assert np.array_equal(exact, fast), "Fast path changed escape counts"
+        print(f"steps={steps:>5} {name:>6}: {t_exact:.3f}s -> {t_fast:.3f}s "
+              f"({t_exact/t_fast:.1f}x)")
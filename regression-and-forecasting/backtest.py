@@ -0,0 +1,91 @@
+"""
+A single split of a time series into training and test data gives only one
+measurement of how well a model forecasts. Rolling-origin evaluation
+(backtesting) repeats the split at many cut points (origins): at each origin
+the model is fitted to the data up to that point and its forecasts are
+compared with the data that follows.
+
+Refitting a model from scratch at every origin is expensive. Consecutive
+origins share almost all of their data, so here the fitted state space model
+is extended with the new observations using ``append``, and the parameter
+estimation is started from the parameters found at the previous origin (so it
+usually converges in a few iterations). The origins are split into contiguous
+blocks that are processed in parallel, each starting with one cold fit.
+"""
+import os
+import time
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+
+from concurrent.futures import ProcessPoolExecutor
+
+def _run_block(endog, origins, order, seasonal_order, trend, horizon,
+               refit_every):
+    rows = []
+    fitted = None
+    for count, origin in enumerate(origins):
+        t_start = time.perf_counter()
+        if fitted is None:
+            model = sm.tsa.SARIMAX(endog[:origin], order=order,
+                                   seasonal_order=seasonal_order, trend=trend)
+            fitted = model.fit(disp=False, cov_type="none")
+            mode = "cold"
+        else:
+            refit = count % refit_every == 0
+            fit_kwargs = {"start_params": fitted.params, "disp": False,
+                          "cov_type": "none"} if refit else None
+            fitted = fitted.append(endog[fitted.nobs:origin], refit=refit,
+                                   fit_kwargs=fit_kwargs)
+            mode = "warm" if refit else "filtered"
+        fit_time = time.perf_counter() - t_start
+
+        actual = endog[origin:origin + horizon]
+        errors = fitted.forecast(len(actual)) - actual
+        rows.append({
+            "origin": origin,
+            "mode": mode,
+            "fit_time": fit_time,
+            "iterations": getattr(fitted, "mle_retvals", {}).get(
+                "iterations", 0) if mode != "filtered" else 0,
+            "mae": np.mean(np.abs(errors)),
+            "rmse": np.sqrt(np.mean(errors**2)),
+            })
+    return rows
+
+def backtest(series, origins, order=(1, 0, 0), seasonal_order=(0, 0, 0, 0),
+             trend=None, horizon=50, workers=None, n_blocks=None,
+             refit_every=1):
+    """
+    Evaluate a SARIMAX model at each origin (the number of observations used
+    for fitting) and return a table of per-origin fit time and forecast error
+    over the following horizon observations. With refit_every > 1 the
+    parameters are only re-estimated at every refit_every-th origin of a
+    block, and the state is just filtered through the new data in between.
+    """
+    endog = np.asarray(series, dtype=np.float64)
+    origins = sorted(origins)
+    workers = workers or os.cpu_count()
+    n_blocks = min(n_blocks or workers, len(origins))
+    blocks = [list(block) for block in np.array_split(origins, n_blocks)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_block, endog, block, order,
+                               seasonal_order, trend, horizon, refit_every)
+                   for block in blocks]
+        rows = [row for future in futures for row in future.result()]
+
+    table = pd.DataFrame(rows)
+    if isinstance(series, pd.Series):
+        table.insert(1, "date", series.index[table["origin"]])
+    return table
+
+
+if __name__ == "__main__":
+    from tsdata import generate_sample_data
+
+    sample_ts, test_ts = generate_sample_data(trend=0.2, undiff=True)
+    series = pd.concat([sample_ts, test_ts])
+    table = backtest(series, range(200, len(series) - 10, 2),
+                     order=(1, 1, 1), trend="t", horizon=10)
+    print(table.describe())
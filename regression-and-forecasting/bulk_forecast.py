@@ -0,0 +1,153 @@
+"""
+The forecasting recipes fit one model to one series. When thousands of series
+(for example, the sales of each product) have to be forecast, the fits are
+independent of one another and can be spread over a pool of processes.
+
+This module takes a long-format DataFrame, with one row per observation and
+columns for the series id, the date (ds) and the value (y), in the same layout
+that Prophet uses. The series are sent to the pool in chunks, with only a
+bounded number of chunks in flight at a time, and the forecasts are appended
+to a Parquet file as each chunk finishes, so the memory used does not grow
+with the number of series. A series whose model fails to fit, or that has no
+finite values or gets a forecast that is not finite, is recorded together with
+the error and does not stop the others.
+"""
+import os
+import time
+import itertools
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+def _future_dates(ds, horizon, freq):
+    freq = freq or pd.infer_freq(ds) or "D"
+    return pd.date_range(ds[-1], periods=horizon + 1, freq=freq)[1:]
+
+def forecast_sarimax(ds, y, horizon, order=(1, 1, 1),
+                     seasonal_order=(0, 0, 0, 0), trend=None, freq=None,
+                     alpha=0.05):
+    model = sm.tsa.SARIMAX(y, order=order, seasonal_order=seasonal_order,
+                           trend=trend)
+    fitted = model.fit(disp=False)
+    forecast = fitted.get_forecast(horizon)
+    conf_int = forecast.conf_int(alpha=alpha)
+    return pd.DataFrame({
+        "ds": _future_dates(ds, horizon, freq),
+        "yhat": forecast.predicted_mean,
+        "yhat_lower": conf_int[:, 0],
+        "yhat_upper": conf_int[:, 1],
+        })
+
+def forecast_prophet(ds, y, horizon, freq=None, **kwargs):
+    try:
+        from prophet import Prophet
+    except ImportError:
+        from fbprophet import Prophet
+
+    model = Prophet(**kwargs)
+    model.fit(pd.DataFrame({"ds": ds, "y": y}))
+    future = model.make_future_dataframe(periods=horizon,
+                                         freq=freq or pd.infer_freq(ds) or "D",
+                                         include_history=False)
+    forecast = model.predict(future)
+    return forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+
+BACKENDS = {
+    "arima": forecast_sarimax,
+    "sarimax": forecast_sarimax,
+    "prophet": forecast_prophet,
+    }
+
+def _forecast_chunk(chunk, backend, horizon, options):
+    forecast = BACKENDS[backend]
+    frames = []
+    failures = []
+    for series_id, ds, y in chunk:
+        t_start = time.perf_counter()
+        try:
+            # an all-NaN series fits without an error, with NaN forecasts
+            if not np.isfinite(y).any():
+                raise ValueError("series has no finite values")
+            frame = forecast(pd.DatetimeIndex(ds), y, horizon, **options)
+            if not np.isfinite(frame["yhat"].to_numpy(np.float64)).all():
+                raise ValueError("forecast has non-finite values")
+        except Exception as err:
+            failures.append({"id": series_id,
+                             "error": f"{type(err).__name__}: {err}"})
+            continue
+        frame.insert(0, "id", series_id)
+        frame["fit_time"] = time.perf_counter() - t_start
+        frames.append(frame)
+    result = pd.concat(frames, ignore_index=True) if frames else None
+    return result, failures
+
+def _chunks(df, id_col, ds_col, y_col, chunk_size):
+    groups = df.groupby(id_col, sort=False)
+    series = ((series_id, group[ds_col].to_numpy(),
+               group[y_col].to_numpy(dtype=np.float64))
+              for series_id, group in groups)
+    while chunk := list(itertools.islice(series, chunk_size)):
+        yield chunk
+
+def bulk_forecast(df, path, backend="sarimax", horizon=50, id_col="id",
+                  ds_col="ds", y_col="y", chunk_size=50, workers=None,
+                  max_pending=None, **options):
+    """
+    Forecast every series in the long-format DataFrame df and write the
+    forecasts to the Parquet file at path. Extra keyword arguments are passed
+    to the backend. Returns a DataFrame of the series that failed, with the
+    error raised for each.
+    """
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or 2*workers
+    chunks = _chunks(df.sort_values([id_col, ds_col], kind="stable"),
+                     id_col, ds_col, y_col, chunk_size)
+
+    failures = []
+    writer = None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            while True:
+                for chunk in itertools.islice(chunks,
+                                              max_pending - len(pending)):
+                    pending.add(pool.submit(_forecast_chunk, chunk, backend,
+                                            horizon, options))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result, chunk_failures = future.result()
+                    failures.extend(chunk_failures)
+                    if result is None:
+                        continue
+                    table = pa.Table.from_pandas(result, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(path, table.schema)
+                    writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return pd.DataFrame(failures, columns=["id", "error"])
+
+
+if __name__ == "__main__":
+    from tsdata import generate_arma_batch
+
+    wide = generate_arma_batch(200, 366, ar_coeffs=(0.8,), const=0.2,
+                               ma_coeffs=(-0.5,), seed=12345, as_frame=True)
+    wide = wide.cumsum(axis=1)
+    wide.index = [f"series-{i:04d}" for i in wide.index]
+    df = wide.stack().rename_axis(["id", "ds"]).rename("y").reset_index()
+
+    t_start = time.perf_counter()
+    failures = bulk_forecast(df, "forecasts.parquet", horizon=50)
+    elapsed = time.perf_counter() - t_start
+    print(f"{df['id'].nunique()} series in {elapsed:.1f}s, "
+          f"{len(failures)} failed")
+    print(pd.read_parquet("forecasts.parquet").head())
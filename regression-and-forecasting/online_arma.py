@@ -0,0 +1,173 @@
+"""
+An ARMA (or ARIMA) model fitted by statsmodels is a state space model, and the
+fitted results hold the Kalman filter state after the last observation. When
+a new observation arrives there is no need to fit the model again: one step
+of the Kalman filter, using the fitted system matrices, brings the state (and
+so the forecasts) up to date. This costs the same for every new point, however
+long the history is.
+
+The parameters of the model still drift over time, so they are re-estimated
+every so often on a thread in the background, starting from the current
+parameters, using a window of recent history. While the refit runs, new
+observations are filtered with the old parameters. When it finishes, the
+state of the refitted model is brought up to date with the observations
+that arrived in the meantime.
+"""
+import time
+import warnings
+import itertools
+import numpy as np
+import statsmodels.api as sm
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+class OnlineARMA:
+    """
+    Online forecaster for a (seasonal) ARIMA model with a time-invariant
+    state space form (trend=None or "c").
+
+    The model is first fitted to the whole of history. Each call to update
+    filters one new observation, and the parameters are re-estimated in the
+    background after every refit_every observations, using only the most
+    recent window observations. If a refit fails, a warning is issued, the
+    error is kept in refit_error and the current parameters stay in use.
+    """
+
+    def __init__(self, history, order=(1, 0, 0), seasonal_order=(0, 0, 0, 0),
+                 trend=None, refit_every=None, window=1000):
+        self.order = order
+        self.seasonal_order = seasonal_order
+        self.trend = trend
+        self.refit_every = refit_every
+        history = np.asarray(history, dtype=np.float64)
+        self.history = deque(history, maxlen=window)
+        self.nobs = len(history)
+        self.n_refits = 0
+        self.refit_error = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._refit = None
+        self._missed = []
+        self._refit_nobs = self.nobs
+        self._load(self._fit(history))
+
+    def _fit(self, endog, start_params=None):
+        model = sm.tsa.SARIMAX(endog, order=self.order,
+                               seasonal_order=self.seasonal_order,
+                               trend=self.trend)
+        return model.fit(start_params=start_params, disp=False,
+                         cov_type="none")
+
+    def _load(self, fitted):
+        ssm = fitted.model.ssm
+        matrices = {}
+        for name in ("design", "obs_intercept", "obs_cov", "transition",
+                     "state_intercept", "selection", "state_cov"):
+            matrix = getattr(ssm, name)
+            # a constant trend is stored as a time-varying intercept
+            if not (matrix == matrix[..., :1]).all():
+                raise ValueError("the state space form must be time-invariant")
+            matrices[name] = matrix[..., 0]
+        self.params = fitted.params
+        self.Z = matrices["design"]
+        self.d = matrices["obs_intercept"]
+        self.H = matrices["obs_cov"]
+        self.T = matrices["transition"]
+        self.c = matrices["state_intercept"]
+        R = matrices["selection"]
+        self.RQR = R @ matrices["state_cov"] @ R.T
+        self.state = fitted.predicted_state[:, -1].copy()
+        self.state_cov = fitted.predicted_state_cov[..., -1].copy()
+
+    def _filter(self, value):
+        # one Kalman filter step from the predicted state for this time to
+        # the predicted state for the next
+        Z, T, P = self.Z, self.T, self.state_cov
+        PZ = P @ Z.T
+        F = Z @ PZ + self.H
+        K = np.linalg.solve(F, PZ.T).T
+        innovation = value - (self.d + Z @ self.state)
+        filtered = self.state + K @ innovation
+        filtered_cov = P - K @ PZ.T
+        self.state = self.c + T @ filtered
+        self.state_cov = T @ filtered_cov @ T.T + self.RQR
+
+    def _check_refit(self):
+        if self._refit is None or not self._refit.done():
+            return
+        refit, self._refit = self._refit, None
+        missed, self._missed = self._missed, []
+        try:
+            fitted = refit.result()
+            self._load(fitted)
+        except Exception as err:
+            # the current state already includes the missed observations
+            self.refit_error = err
+            warnings.warn(f"refit failed, keeping the current parameters: "
+                          f"{err!r}", RuntimeWarning)
+            return
+        self.n_refits += 1
+        # catch up with the observations that arrived during the refit
+        for value in missed:
+            self._filter(value)
+
+    def refit(self):
+        """Start re-estimating the parameters in the background."""
+        if self._refit is not None:
+            return
+        self._refit_nobs = self.nobs
+        self._refit = self._executor.submit(
+            self._fit, np.array(self.history), self.params)
+
+    def update(self, value):
+        self._check_refit()
+        self.history.append(value)
+        self.nobs += 1
+        value = np.atleast_1d(value)
+        self._filter(value)
+        if self._refit is not None:
+            self._missed.append(value)
+        if (self.refit_every
+                and self.nobs - self._refit_nobs >= self.refit_every):
+            self.refit()
+
+    def forecast(self, steps=1):
+        self._check_refit()
+        state = self.state
+        forecasts = np.empty(steps)
+        for i in range(steps):
+            forecasts[i] = (self.d + self.Z @ state)[0]
+            state = self.c + self.T @ state
+        return forecasts
+
+    def close(self):
+        self._executor.shutdown()
+
+
+def stream(forecaster, iterable, n, steps=1):
+    """
+    Feed n values from iterable (such as the generators in tsdata) to
+    forecaster, yielding each value, the forecast made for it before it
+    arrived and the time taken by the update, in seconds.
+    """
+    for value in itertools.islice(iterable, n):
+        forecast = forecaster.forecast(steps)[0]
+        t_start = time.perf_counter()
+        forecaster.update(value)
+        yield value, forecast, time.perf_counter() - t_start
+
+
+if __name__ == "__main__":
+    from tsdata import generate_arma
+
+    gen = generate_arma(ar_coeffs=(0.8,), ma_coeffs=(-0.5,), seed=12345)
+    history = list(itertools.islice(gen, 500))
+    forecaster = OnlineARMA(history, order=(1, 0, 1), refit_every=1000)
+
+    values, forecasts, latency = map(np.array,
+                                     zip(*stream(forecaster, gen, 5000)))
+    forecaster.close()
+    print(f"{len(values)} updates, {forecaster.n_refits} refits")
+    print(f"update latency: median {np.median(latency)*1e6:.0f}us, "
+          f"99th percentile {np.percentile(latency, 99)*1e6:.0f}us")
+    print(f"one-step RMSE: {np.sqrt(np.mean((values - forecasts)**2)):.3f}")
@@ -0,0 +1,183 @@
+"""
+In the ARIMA recipes the model orders are read off the ACF and PACF plots.
+When many series have to be modeled, the orders are instead chosen by fitting
+a grid of candidate (S)ARIMA models and ranking them by an information
+criterion such as the AIC.
+
+Models with different orders of differencing are fitted to different series,
+so their likelihoods (and AICs) cannot be compared. The differencing orders
+are therefore chosen first: the series is differenced once for each
+combination of d and D, and the smallest amount of differencing for which the
+augmented Dickey-Fuller test rejects a unit root is used. The differenced
+series, with its ACF and PACF, is shared by all of the candidates, each of
+which is fitted to it as an ARMA model.
+
+The candidates are fitted on a pool of processes, keeping a bounded number
+of fits in flight, starting with the largest model and then in order of
+increasing size. Since a nested model can never have a larger likelihood,
+the largest model gives a lower bound on the AIC of every candidate,
+
+    AIC >= 2*k - 2*llf(largest model),
+
+and a candidate whose bound already exceeds the best AIC found so far when a
+slot frees up is not fitted at all. The bound is only used when the fit of
+the largest model converged (it is allowed more iterations than the others);
+pass prune=False to fit every candidate. The pruning is a heuristic, not a
+guarantee: the bound holds for the maximum likelihood of the largest model,
+but the optimizer may converge to a local optimum below it, and the bound
+then prunes candidates that could have won.
+
+A fit whose optimizer did not converge has the status "not converged". Its
+likelihood is not a maximum, so its AIC is unreliable, and it is ranked after
+all of the converged fits.
+"""
+import os
+import time
+import itertools
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from statsmodels.tsa.statespace.tools import diff
+
+def candidate_orders(max_p=3, d_values=(0, 1), max_q=3, max_P=0,
+                     D_values=(0,), max_Q=0, period=0):
+    if not period:
+        max_P = max_Q = 0
+        D_values = (0,)
+    for p, d, q, P, D, Q in itertools.product(
+            range(max_p + 1), d_values, range(max_q + 1), range(max_P + 1),
+            D_values, range(max_Q + 1)):
+        yield (p, d, q), (P, D, Q, period)
+
+def n_params(order, seasonal_order, trend="c"):
+    # ARMA coefficients, the noise variance and the trend terms
+    n_trend = 0 if trend in (None, "n") else len(trend)
+    return order[0] + order[2] + seasonal_order[0] + seasonal_order[2] \
+        + 1 + n_trend
+
+def prepare(series, d_values=(0, 1), D_values=(0,), period=0, nlags=20):
+    """
+    Difference series once for each (d, D) and compute the ACF, the PACF and
+    the p-value of the augmented Dickey-Fuller test of the differenced series.
+    """
+    cache = {}
+    for d, D in itertools.product(d_values, D_values if period else (0,)):
+        diffed = np.asarray(diff(series, k_diff=d, k_seasonal_diff=D,
+                                 seasonal_periods=period or 1),
+                            dtype=np.float64)
+        lags = min(nlags, len(diffed) // 2 - 1)
+        cache[d, D] = {
+            "series": diffed,
+            "acf": sm.tsa.acf(diffed, nlags=lags, fft=True),
+            "pacf": sm.tsa.pacf(diffed, nlags=lags),
+            "adf_pvalue": sm.tsa.adfuller(diffed)[1],
+            }
+    return cache
+
+def choose_differencing(cache, alpha=0.05):
+    """
+    The smallest (D, d) in cache whose differenced series is stationary by
+    the ADF test at level alpha, or the largest if none is.
+    """
+    groups = sorted(cache, key=lambda group: (group[1], group[0]))
+    for d, D in groups:
+        if cache[d, D]["adf_pvalue"] < alpha:
+            return d, D
+    return groups[-1]
+
+def _fit(diffed, order, seasonal_order, trend, maxiter):
+    p, _, q = order
+    P, _, Q, period = seasonal_order
+    t_start = time.perf_counter()
+    try:
+        model = sm.tsa.SARIMAX(diffed, order=(p, 0, q),
+                               seasonal_order=(P, 0, Q, period),
+                               trend=trend)
+        fitted = model.fit(disp=False, maxiter=maxiter)
+    except Exception as err:
+        return {"status": f"failed: {err}"}
+    converged = bool(fitted.mle_retvals.get("converged", False))
+    return {
+        "status": "fitted" if converged else "not converged",
+        "converged": converged,
+        "aic": fitted.aic,
+        "bic": fitted.bic,
+        "llf": fitted.llf,
+        "fit_time": time.perf_counter() - t_start,
+        }
+
+def select_order(series, max_p=3, d_values=(0, 1), max_q=3, max_P=0,
+                 D_values=(0,), max_Q=0, period=0, trend="c", workers=None,
+                 prune=True, maxiter=50, alpha=0.05):
+    """
+    Choose the differencing orders, fit the grid of candidate ARMA orders to
+    the differenced series and return a table of the candidates ranked by
+    AIC (converged fits first), together with the cache of differenced
+    series and their ACF and PACF.
+    """
+    cache = prepare(series, d_values, D_values, period)
+    d, D = choose_differencing(cache, alpha)
+    diffed = cache[d, D]["series"]
+    candidates = sorted(
+        candidate_orders(max_p, (d,), max_q, max_P, (D,), max_Q, period),
+        key=lambda c: n_params(*c, trend))
+    # the largest model first, to bound all of the others
+    candidates.insert(0, candidates.pop())
+
+    workers = workers or os.cpu_count()
+    rows = []
+    bound_llf = None
+    best = np.inf
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        remaining = iter(candidates)
+        while True:
+            for order, seasonal_order in remaining:
+                k = n_params(order, seasonal_order, trend)
+                row = {"order": order, "seasonal_order": seasonal_order,
+                       "k": k}
+                rows.append(row)
+                if bound_llf is not None:
+                    row["aic_bound"] = 2*k - 2*bound_llf
+                    if prune and row["aic_bound"] >= best:
+                        row["status"] = "pruned"
+                        continue
+                largest = len(rows) == 1
+                future = pool.submit(_fit, diffed, order, seasonal_order,
+                                     trend, 4*maxiter if largest else maxiter)
+                pending[future] = (row, largest)
+                if len(pending) >= workers:
+                    break
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                row, largest = pending.pop(future)
+                row.update(future.result())
+                if "aic" not in row:
+                    continue
+                best = min(best, row["aic"])
+                if largest and row["converged"]:
+                    bound_llf = row["llf"]
+
+    table = pd.DataFrame(rows, columns=[
+        "order", "seasonal_order", "k", "aic", "bic", "llf", "aic_bound",
+        "converged", "fit_time", "status"])
+    # converged fits, then unconverged ones, then the pruned and failed
+    group = table["status"].map({"fitted": 0, "not converged": 1}).fillna(2)
+    table = table.assign(group=group).sort_values(
+        ["group", "aic"], na_position="last", kind="stable")
+    return table.drop(columns="group").reset_index(drop=True), cache
+
+
+if __name__ == "__main__":
+    from tsdata import generate_sample_data
+
+    sample_ts, _ = generate_sample_data(undiff=True, seasonal=True)
+    table, _ = select_order(sample_ts, max_p=2, max_q=2, max_P=1, max_Q=1,
+                            period=7)
+    print(table.head(10))
+    print(table["status"].value_counts())
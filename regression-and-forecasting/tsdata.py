@@ -3,7 +3,8 @@ import numpy as np
 import pandas as pd
 import itertools
 
-from numpy.random import default_rng
+from numpy.random import default_rng, SeedSequence
+from scipy.signal import lfilter
 
 
 
@@ -56,6 +57,152 @@ def generate_arma(ar_coeffs=(0.9,), const=0.0, start=0.0,
         past_terms.append(curr)
 
 
+def _get_n_blocks(blocks, n):
+    chunks = []
+    while n > 0:
+        chunk = next(blocks)[:n]
+        chunks.append(chunk)
+        n -= len(chunk)
+    return np.concatenate(chunks) if chunks else np.empty(0)
+
+def _ma_filter(errs, coeffs, past_errs):
+    # Sum the terms in the same order as generate_ma so the values match
+    # exactly; past_errs holds the last len(coeffs) errors, oldest first.
+    n = len(coeffs)
+    terms = np.concatenate((past_errs, errs))
+    total = np.zeros(len(errs))
+    for k in range(n, 0, -1):
+        total = total + coeffs[k-1]*terms[n-k:n-k+len(errs)]
+    return errs + total
+
+def _ar_state(coeffs, past_vals):
+    # lfilter state equivalent to the last len(coeffs) values (oldest first),
+    # accumulated in the same order as generate_ar sums them. Trailing axes
+    # of past_vals are carried through, for several series at once.
+    n = len(coeffs)
+    state = np.zeros((n,) + np.shape(past_vals)[1:])
+    for k in range(n):
+        total = 0.0
+        for m in range(n, k, -1):
+            total = total + coeffs[m-1]*past_vals[n-m+k]
+        state[k] = total
+    return state
+
+def _ar_filter(inputs, coeffs, state):
+    if not len(coeffs):
+        return inputs + 0.0, state
+    denom = np.concatenate(([1.0], -np.asarray(coeffs, dtype=np.float64)))
+    return lfilter([1.0], denom, inputs, zi=state)
+
+def generate_ma_blocks(*coeffs, std=1.0, seed=12345, block_size=1024):
+    rng = default_rng(seed=seed)
+    n = len(coeffs)
+    past_errs = np.zeros(n)
+
+    while True:
+        errs = rng.normal(0, std, size=block_size)
+        yield _ma_filter(errs, coeffs, past_errs)
+        past_errs = np.concatenate((past_errs, errs))[block_size:]
+
+def generate_ar_blocks(*coeffs, const=0.0, start=0.0, block_size=1024):
+    n = len(coeffs)
+    past_vals = np.zeros(n)
+    if n:
+        past_vals[-1] = start
+    state = _ar_state(coeffs, past_vals)
+    inputs = np.full(block_size, const, dtype=np.float64)
+
+    while True:
+        vals, state = _ar_filter(inputs, coeffs, state)
+        yield vals
+
+def generate_arma_blocks(ar_coeffs=(0.9,), const=0.0, start=0.0,
+                         ma_coeffs=(), noise_std=1.0, seed=None,
+                         block_size=1024):
+    n = len(ar_coeffs)
+    past_vals = np.zeros(n)
+    if n:
+        past_vals[-1] = start
+    state = _ar_state(ar_coeffs, past_vals)
+
+    # generate_arma yields start first, so every block is shifted by one
+    carry = start
+    ma_proc = generate_ma_blocks(*ma_coeffs, std=noise_std, seed=seed,
+                                 block_size=block_size)
+    for errs in ma_proc:
+        vals, state = _ar_filter(const + errs, ar_coeffs, state)
+        yield np.concatenate(([carry], vals[:-1]))
+        carry = vals[-1]
+
+def _per_series(value, n_series, ndim):
+    value = np.asarray(value, dtype=np.float64)
+    if value.ndim < ndim:
+        value = np.broadcast_to(value, (n_series,) + value.shape)
+    if value.shape[0] != n_series:
+        raise ValueError(f"Expected parameters for {n_series} series, "
+                         f"got {value.shape[0]}")
+    return value
+
+def series_seeds(seed, n_series):
+    if isinstance(seed, (list, tuple)):
+        if len(seed) != n_series:
+            raise ValueError(f"Expected {n_series} seeds, got {len(seed)}")
+        return list(seed)
+    if not isinstance(seed, SeedSequence):
+        seed = SeedSequence(seed)
+    return seed.spawn(n_series)
+
+def generate_arma_batch(n_series, length, ar_coeffs=(0.9,), const=0.0,
+                        start=0.0, ma_coeffs=(), noise_std=1.0, seed=None,
+                        as_frame=False):
+    """
+    Generate n_series independent ARMA series of the given length.
+
+    ar_coeffs and ma_coeffs are either shared by all series or have one row
+    per series; const, start and noise_std are scalars or have one value per
+    series. Each series has its own random stream, spawned from seed with
+    SeedSequence.spawn, so the result does not depend on how the series are
+    split between calls or processes (seed can also be a list of the spawned
+    SeedSequences for a subset of the series). Each row follows the same
+    recursion as generate_arma.
+    """
+    seeds = series_seeds(seed, n_series)
+    ar = _per_series(ar_coeffs, n_series, 2)
+    ma = _per_series(ma_coeffs, n_series, 2)
+    const = _per_series(const, n_series, 1)
+    start = _per_series(start, n_series, 1)
+    noise_std = _per_series(noise_std, n_series, 1)
+    n_ar = ar.shape[1]
+    n_ma = ma.shape[1]
+
+    errs = np.empty((n_series, length - 1))
+    for i, child in enumerate(seeds):
+        errs[i] = default_rng(child).normal(0, noise_std[i], size=length - 1)
+
+    total = np.zeros_like(errs)
+    for k in range(n_ma, 0, -1):
+        total[:, k:] = total[:, k:] + ma[:, k-1:k]*errs[:, :-k]
+    inputs = const[:, np.newaxis] + (errs + total)
+
+    vals = np.zeros((n_series, length + n_ar))
+    vals[:, n_ar] = start
+    if n_ar and (ar == ar[0]).all():
+        # shared coefficients: filter all series at once
+        denom = np.concatenate(([1.0], -ar[0]))
+        zi = _ar_state(ar[0], vals[:, 1:n_ar+1].T).T
+        vals[:, n_ar+1:] = lfilter([1.0], denom, inputs, axis=1, zi=zi)[0]
+    else:
+        for t in range(n_ar + 1, length + n_ar):
+            vals[:, t] = inputs[:, t-n_ar-1] + np.einsum(
+                "ij,ij->i", ar[:, ::-1], vals[:, t-n_ar:t])
+    vals = vals[:, n_ar:]
+
+    if as_frame:
+        return pd.DataFrame(
+            vals, columns=pd.date_range("2020-01-01", periods=length))
+    return vals
+
+
 def undifference(iterable):
     tot = next(iterable)  # first term
     for cur in iterable:
@@ -75,17 +222,45 @@ def add_season_ar(iterable, period=7, coeffs=(0.7,)):
         past_vals.append(new)
 
 
-def generate_sample_data(train=366, test=50, trend=0.0, undiff=False, seasonal=False):
-    gen = generate_arma(seed=12345, const=trend, ar_coeffs=(0.8,), ma_coeffs=(-0.5,))
-    
+def undifference_blocks(blocks):
+    # running total carried across blocks, summed in the same order as
+    # undifference
+    carry = 0.0
+    for block in blocks:
+        totals = np.cumsum(np.concatenate(([carry], block)))[1:]
+        yield totals
+        carry = totals[-1]
+
+def season_ar_blocks(blocks, period=7, coeffs=(0.7,)):
+    n = len(coeffs)
+    denom = np.zeros(period + n)
+    denom[0] = 1.0
+    denom[period:] = -np.asarray(coeffs, dtype=np.float64)
+    state = np.zeros(period + n - 1)
+
+    for block in blocks:
+        vals, state = lfilter([1.0], denom, block, zi=state)
+        yield vals
+
+def generate_sample_blocks(trend=0.0, undiff=False, seasonal=False,
+                           block_size=1024):
+    blocks = generate_arma_blocks(seed=12345, const=trend, ar_coeffs=(0.8,),
+                                  ma_coeffs=(-0.5,), block_size=block_size)
+
     if seasonal:
-        gen = add_season_ar(gen)
-    
+        blocks = season_ar_blocks(blocks)
+
     if undiff:
-        gen = undifference(gen)
-    
+        blocks = undifference_blocks(blocks)
+
+    return blocks
+
+def generate_sample_data(train=366, test=50, trend=0.0, undiff=False, seasonal=False):
+    blocks = generate_sample_blocks(trend=trend, undiff=undiff,
+                                    seasonal=seasonal)
+
     indices = pd.date_range("2020-01-01", periods=train+test)
-    data = _get_n(gen, train+test)
+    data = _get_n_blocks(blocks, train+test)
     return (pd.Series(data[:-test], index=indices[:-test]), 
             pd.Series(data[-test:], index=indices[-test:]))
 